@@ -1,21 +1,48 @@
-from flask import Flask, request, jsonify, render_template
-from pymongo import MongoClient
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from pymongo.errors import PyMongoError
 from bson import ObjectId
+from breaker import CircuitBreaker, CircuitOpenError
+from catalog import Catalog
+from classifier import load_classifier
+from lexicon import Lexicon
+from data import MongoConnection
+import metrics
+from review_stats import ReviewSummaries
+from review_search import ReviewSearch
+from sessions import SessionContext, make_session_store
+from querylog import FileSink, MongoSink, QueryLog
+from recommendations import RECOMMEND_LOG_DAYS, Recommendations
+from matcher import KeywordMatcher
+from memo import Memo
+from normalize import Spellings, normalize
+from fuzzy import FuzzyIndex
+from fragments import Fragment, FragmentCache, negotiate
+from review_loader import REVIEW_PAGE_SIZE, REVIEW_PROJECTION, REVIEW_SORTS, ReviewLoader, encode_token, ensure_indexes, page_filter
+import hashlib
+import html
+import itertools
 import json
-from datetime import datetime
-from difflib import get_close_matches
+import math
+import re
+from collections import namedtuple
+from datetime import datetime, timezone
 import os
 import random
-import re
+import secrets
+import threading
+import time
+from urllib.parse import urlencode
 
 app = Flask(__name__, static_url_path='/static', static_folder='static', template_folder='templates')
 
-# MongoDB connection
+# MongoDB connection, opened lazily in each worker process
 mongo_uri = os.environ.get("MONGO_URI")
-client = MongoClient(mongo_uri)
-db = client["isvaryam"]
-products = db["products"]
-reviews = db["reviews"]
+mongo = MongoConnection(mongo_uri, "isvaryam", event_listeners=[metrics.MongoCommandMetrics()])
+products = mongo.collection("products")
+reviews = mongo.collection("reviews")
+
+# Deadlines and fail-fast for the review reads requests wait on
+mongo_breaker = CircuitBreaker("mongo")
 
 # Local data
 with open("ingredients.json") as f:
@@ -23,97 +50,313 @@ with open("ingredients.json") as f:
 with open("contact.json") as f:
     contact_data = json.load(f)
 
-# Product mappings and configurations
-tanglish_map = {
-    "chekku ennai": "sesame oil", "chekku oil": "sesame oil", "chekku": "sesame oil",
-    "naalennai": "sesame oil", "gingelly oil": "sesame oil", "nellennai": "sesame oil",
-    "kadalai ennai": "groundnut oil", "groundnut ennai": "groundnut oil", 
-    "kadalai oil": "groundnut oil", "verkadalai ennai": "groundnut oil",
-    "coconut ennai": "coconut oil", "thengai ennai": "coconut oil", 
-    "ennai": "oil", "thengai ennai": "coconut oil", 
-    "thengai oil": "coconut oil", "vennai": "coconut oil",
-    "sakkarai": "jaggery powder", "vellam": "jaggery powder", 
-    "karupatti": "jaggery powder", "panai vellam": "jaggery powder",
-    "nei": "ghee", "vennai": "ghee", "thuppa": "ghee",
-    "combo pack": "super pack", "oil combo": "super pack", 
-    "3 oil combo": "super pack", "combo": "super pack",
-    "oil pack": "super pack", "oil set": "super pack", 
-    "oil bundle": "super pack", "oil collection": "super pack",
-    "oil trio": "super pack", "oil variety": "super pack", 
-    "oil combo pack": "super pack",
-    "sugar": "jaggery powder", "brown sugar": "jaggery powder", 
-    "natural sweetener": "jaggery powder"
-}
+PRODUCT_GUIDANCE_RESPONSES = [
+    "🌿 I specialize in Isvaryam products. Ask about: <b>sesame oil</b>, <b>coconut oil</b>, or <b>ghee</b>!",
+    "🛢️ Need help with oils? Try: <b>'price of groundnut oil'</b> or <b>'benefits of coconut oil'</b>",
+    "💡 Example queries: <br>- <b>'Show sesame oil prices'</b><br>- <b>'What's in your super pack?'</b>"
+]
 
-alias_map = {
-    "combo pack": "super pack", "oil combo": "super pack", "3 oil combo": "super pack",
-    "combo": "super pack", "sugar": "jaggery powder", "oil pack": "super pack",
-    "oil set": "super pack", "oil bundle": "super pack", "oil collection": "super pack",
-    "oil trio": "super pack", "oil variety": "super pack", "oil combo pack": "super pack",
-    "brown sugar": "jaggery powder", "natural sweetener": "jaggery powder",
-    "gingelly oil": "sesame oil", "peanut oil": "groundnut oil"
-}
+# Intent keyword tables
+ABOUT_KEYWORDS = ["about", "what", "who", "tell me"]
 
-combined_map = {**tanglish_map, **alias_map}
+PRICE_LIST_QUERIES = {"price", "prices", "price details", "cost", "rate"}
 
-# Product links
-product_links = {
-    "coconut oil": "https://isvaryam.com/products/cold-pressed-coconut-oil?sku_id=24459981",
-    "groundnut oil": "https://isvaryam.com/products/cold-pressed-groundnut-oil?sku_id=26795436",
-    "sesame oil": "https://isvaryam.com/products/cold-pressed-sesame-oil?sku_id=26795647",
-    "jaggery powder": "https://isvaryam.com/products/organic-jaggery-powder?sku_id=24463067",
-    "super pack": "https://isvaryam.com/products/super-pack-1-lt-coconut-oil-1-lt-sesame-oil-1-lt-groundnut-oil?sku_id=24633382",
-    "ghee": "https://isvaryam.com"  # Add actual ghee link when available
-}
+BENEFIT_LIST_QUERIES = {"benefits", "benefit", "product benefits", "health benefits", "advantages"}
 
-# Recommendations
-recommendations = {
-    "groundnut oil": ["coconut oil", "sesame oil", "super pack", "ghee"],
-    "coconut oil": ["sesame oil", "groundnut oil", "super pack", "jaggery powder"],
-    "sesame oil": ["groundnut oil", "coconut oil", "super pack", "ghee"],
-    "ghee": ["jaggery powder", "super pack"],
-    "jaggery powder": ["ghee", "coconut oil"],
-    "super pack": ["groundnut oil", "coconut oil", "sesame oil", "jaggery powder"]
-}
+GREETINGS = ["hi", "hello", 
+            "hey", "yo", "hola", "what's up", "greetings", "hi there", 
+            "hello there", "hey there", "hiya", "howdy"]
 
-# Benefits information
-product_benefits = {
-    "groundnut oil": ["Heart healthy", "Rich in Vitamin E", "Good for skin", "High smoke point"],
-    "coconut oil": ["Boosts immunity", "Great for hair care", "Natural moisturizer", "Antimicrobial properties"],
-    "sesame oil": ["Rich in antioxidants", "Good for bone health", "Anti-inflammatory", "Helps reduce stress"],
-    "ghee": ["Improves digestion", "Boosts immunity", "Good for brain function", "Rich in fat-soluble vitamins"],
-    "jaggery powder": ["Natural detoxifier", "Rich in iron", "Good for digestion", "Better than refined sugar"],
-    "super pack": ["Variety of oils", "Cost effective", "Try different options", "Complete cooking solution"]
-}
+SILLY_QUERIES = ["are you real", "can i marry you", "what's your name", "do you love me", 
+                "you single", "can you cook", "sing a song", "tell a joke", "you look nice", 
+                "you cute", "what is 0/0", "do you sleep", "are you ai", "how are you", 
+                "how do you know this", "what are you", "who made you", "are you human",
+                "do you dream", "what do you eat", "your age", "how old are you"]
 
-# Security and content filtering
-OFFENSIVE_KEYWORDS = {
-    "sex", "rape", "porn", "fuck", "shit", "ass", "dick", "rat", "cock", "pussy", "gommapunda", "goma", "kenathayoli", 
-    "cunt", "bitch", "slut", "whore", "penis", "vagina", "boobs", "nude", "punda", "gotha", "thailii", "thayoli", "thayolli", "oombu", "ombu", "gomma", "kenap", "kenappunda", "gothapunda",
-    "naked", "xxx", "adult", "nsfw", "hentai", "incest", "molest", "pedo"
-}
+CONTACT_KEYWORDS = ["location","contact","contact isvaryam","isvaryam contact","isvaryam location","location of isvaryam", "where is isvaryam", "where is your store", "store address", 
+                    "address", "location of company", "physical store", "visit us", 
+                    "come to shop", "outlet", "shop location"]
 
-UNRELATED_KEYWORDS = {
-    "movie", "sports", "music", "politics", "religion", "football", "cricket","lusu","mairu"
-    "weather", "news", "bitcoin", "crypto", "stock", "elon", "musk", "ai", "gugan", "sannathayoli", "sannanai",
-    "chatgpt", "google", "facebook", "tiktok", "instagram", "whatsapp","pranaesh","sannam","deepak"
-}
+DELIVERY_KEYWORDS = ["delivery","deliver", "shipping", "how many days", "when will it reach", 
+                    "delivery time", "how fast", "dispatch", "courier", "shipment", 
+                    "arrival time", "when delivered", "reach my home", "reach my place",
+                    "shipping policy", "delivery options", "shipping cost", "delivery charges"]
 
-PRODUCT_GUIDANCE_RESPONSES = [
-    "🌿 I specialize in Isvaryam products. Ask about: <b>sesame oil</b>, <b>coconut oil</b>, or <b>ghee</b>!",
-    "🛢️ Need help with oils? Try: <b>'price of groundnut oil'</b> or <b>'benefits of coconut oil'</b>",
-    "💡 Example queries: <br>- <b>'Show sesame oil prices'</b><br>- <b>'What's in your super pack?'</b>"
+PRODUCT_LIST_KEYWORDS = ["products","isvaryam", "what do you have", "show all", "available items", 
+                        "list items", "what can i buy", "items available", "product catalog",
+                        "all offerings", "complete list", "full range", "entire collection"]
+
+BENEFIT_QUESTION_KEYWORDS = ["benefit", "advantage", "good for", "why use"]
+
+REVIEW_KEYWORDS = ["reviews", "product reviews", "show reviews", "customer feedback", "testimonials"]
+
+PRICE_KEYWORDS = ["price", "cost", "rate", "how much"]
+
+INGREDIENT_KEYWORDS = ["ingredient", "contains", "what is in", "made of"]
+
+IMAGE_KEYWORDS = ["image", "photo", "pic", "picture", "show me"]
+
+BENEFIT_KEYWORDS = ["benefit", "advantages", "features", "why choose", "good for", 
+                    "health benefits", "nutritional value", "why use", "pros", "uses",
+                    "how helps", "what's good", "positive effects", "nutrition", "healthy",
+                    "wellness", "advantages of"]
+
+ALL_REVIEWS_KEYWORDS = ["reviews", "review", "product reviews", "show reviews", "customer feedback", "testimonials"]
+
+ALL_RATINGS_KEYWORDS = ["ratings", "rate all", "average rating", "all ratings"]
+
+# Review listing order; anything else lists oldest first
+NEWEST_KEYWORDS = ["newest", "latest", "recent"]
+
+# "reviews about smell", "any complaints regarding packaging", "feedback on thengai ennai taste"
+REVIEW_SEARCH_RE = re.compile(r"\b(reviews?|complaints?|feedback|comments?)\s+(?:about|on|regarding|mentioning|saying)\s+(.+)")
+
+HIGHEST_RATED_KEYWORDS = ["highest", "best", "top rated", "top-rated"]
+
+# Words asking for a comparison; without one, only two product names proper make a message a comparison
+COMPARE_KEYWORDS = ["vs", "versus", "compare", "comparison", "difference", "better than", "or", "and"]
+
+# Product hints, checked in order, used by the Tanglish and generic-oil fallbacks
+OIL_TERMS = ["oil", "ennai", "taila", "thailam"]
+
+TANGLISH_OIL_HINTS = [
+    ("groundnut oil", ["kadalai", "peanut", "groundnut"]),
+    ("coconut oil", ["thengai", "coconut"]),
+    ("sesame oil", ["chekku", "gingelly", "nalla", "gingerly"]),
+]
+
+TANGLISH_PRODUCT_HINTS = [
+    ("jaggery powder", ["sakkarai", "vellam", "karupatti"]),
+    ("ghee", ["nei", "ghee", "thuppa"]),
 ]
 
-# Initialize product mappings
-product_map = {str(p["_id"]): p["name"] for p in products.find()}
-product_name_to_id = {p["name"].lower(): str(p["_id"]) for p in products.find()}
+BRAND_CONTEXT_KEYWORDS = ["isvaryam", "your", "product"]
+
+# Everyday Tanglish words never respelled as a product word ("enna" is "what", not "ennai")
+TANGLISH_COMMON_WORDS = ["enna", "evlo", "evvalavu", "epdi", "eppo", "irukka", "iruka", "venum", "romba", "konjam"]
+
+BRAND_OIL_HINTS = [
+    ("groundnut oil", ["groundnut", "peanut"]),
+    ("coconut oil", ["coconut"]),
+    ("sesame oil", ["sesame", "gingelly"]),
+    ("ghee", ["ghee"]),
+    ("jaggery powder", ["jaggery", "sugar"]),
+    ("super pack", ["combo", "pack"]),
+]
+
+class Vocabulary:
+    """Product terms, catalog metadata and keyword automaton compiled from one lexicon.json version"""
+
+    def __init__(self, lexicon):
+        self.version = lexicon["version"]
+        self.tanglish_map = lexicon["tanglish_map"]
+        self.alias_map = lexicon["alias_map"]
+        self.combined_map = {**self.tanglish_map, **self.alias_map}
+        self.recommendations = lexicon["recommendations"]
+        self.product_benefits = lexicon["product_benefits"]
+        self.product_links = lexicon["product_links"]
+
+        # Every word or phrase naming one product, for spotting several products in one message
+        # ("pack" alone is too generic to count as the Super Pack here)
+        self.product_mentions = {
+            **{kw: name for name, kws in TANGLISH_OIL_HINTS + TANGLISH_PRODUCT_HINTS + BRAND_OIL_HINTS for kw in kws if kw != "pack"},
+            **{alias: name for alias, name in self.combined_map.items() if name != "oil"},
+            **{name: name for name in ingredients_data},
+        }
+
+        # Dict order decides which Tanglish term wins when several occur
+        self.tanglish_order = {term: i for i, term in enumerate(self.combined_map)}
+
+        # Every keyword table, compiled into one automaton; offensive/unrelated terms only match whole words
+        groups = {
+            "offensive": lexicon["offensive_keywords"],
+            "unrelated": lexicon["unrelated_keywords"],
+            "about": ABOUT_KEYWORDS,
+            "brand": ["isvaryam"],
+            "greeting": GREETINGS,
+            "silly": SILLY_QUERIES,
+            "contact": CONTACT_KEYWORDS,
+            "delivery": DELIVERY_KEYWORDS,
+            "product_list": PRODUCT_LIST_KEYWORDS,
+            "benefit_question": BENEFIT_QUESTION_KEYWORDS,
+            "reviews": REVIEW_KEYWORDS,
+            "rating": ["rating"],
+            "price": PRICE_KEYWORDS,
+            "ingredient": INGREDIENT_KEYWORDS,
+            "image": IMAGE_KEYWORDS,
+            "benefit": BENEFIT_KEYWORDS,
+            "all_reviews": ALL_REVIEWS_KEYWORDS,
+            "all_ratings": ALL_RATINGS_KEYWORDS,
+            "sort_newest": NEWEST_KEYWORDS,
+            "sort_highest": HIGHEST_RATED_KEYWORDS,
+            "compare": COMPARE_KEYWORDS,
+            "tanglish": self.combined_map.keys(),
+            "oil_term": OIL_TERMS,
+            "oil": ["oil"],
+            "brand_context": BRAND_CONTEXT_KEYWORDS,
+            "product": self.product_mentions.keys(),
+            **{f"tanglish:{name}": kws for name, kws in TANGLISH_OIL_HINTS + TANGLISH_PRODUCT_HINTS},
+            **{f"brand_oil:{name}": kws for name, kws in BRAND_OIL_HINTS},
+        }
+        self.intent_matcher = KeywordMatcher(groups, word_groups=("offensive", "unrelated", "product", "compare"))
+
+        # Transliteration variants ("thenga", "yennai", "karuppatti") respelled as the product words they stand for
+        product_words = {word for term in (*self.product_mentions, *self.combined_map, *OIL_TERMS) for word in term.split()}
+        keyword_words = {word for keywords in groups.values() for kw in keywords for word in kw.split()}
+        self.spellings = Spellings(product_words, keyword_words | set(TANGLISH_COMMON_WORDS))
+
+        # Typo-tolerant index over product names and aliases for the last-resort match
+        self.product_name_index = FuzzyIndex(list(ingredients_data.keys()) + list(self.combined_map.keys()))
+
+def lexicon_reloaded(vocab):
+    """Bring state built from the previous lexicon up to date"""
+    review_search.set_synonyms(vocab.combined_map)
+
+# Product terms, links, benefits, recommendations and blocked words; edits are picked up without a restart
+LEXICON_PATH = os.environ.get("LEXICON_PATH", "lexicon.json")
+lexicon = Lexicon(LEXICON_PATH, Vocabulary, products=ingredients_data, on_reload=lexicon_reloaded)
+
+# Intent for messages the keyword rules miss (intent_model.npz, built from intent_examples.json)
+intent_classifier = load_classifier()
+
+# Words a follow-up like "and reviews?" or "how much?" may consist of, besides the block it asks for
+FOLLOW_UP_FILLERS = {"and", "what", "about", "how", "is", "it", "its", "it's", "the", "for", "of", "me", "any",
+                     "tell", "please", "this", "that", "also", "then", "show", "give", "see", "there", "are", "do", "you", "have"}
+FOLLOW_UP_BLOCKS = ["price", "reviews", "rating", "benefit", "benefit_question", "ingredient", "image"]
+FOLLOW_UP_WORDS = FOLLOW_UP_FILLERS | {
+    word
+    for keywords in (PRICE_KEYWORDS, REVIEW_KEYWORDS, ["rating", "ratings"], BENEFIT_KEYWORDS, BENEFIT_QUESTION_KEYWORDS,
+                     INGREDIENT_KEYWORDS, IMAGE_KEYWORDS, BENEFIT_LIST_QUERIES, PRICE_LIST_QUERIES)
+    for phrase in keywords
+    for word in phrase.split()
+}
+
+# Intents answered by a fixed response list, in priority order
+SIMPLE_INTENTS = ["greeting", "silly", "contact", "delivery", "product_list"]
+
+# Intents answered from in-memory catalog and review data, flagged when that may be stale
+DATA_INTENTS = {"product", "compare", "all_prices", "all_benefits", "all_ratings", "review_search"}
+STALE_WARNING = '110 - "Response is Stale"'
+REVIEWS_UNAVAILABLE = "⚠️ Reviews are temporarily unavailable. Please try again in a minute."
+
+# Last loaded catalog and review summaries are kept here so a fresh worker can serve at once
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+# Longest a request waits for a worker's first data when there is no snapshot to serve
+STARTUP_WAIT = float(os.environ.get("STARTUP_WAIT", "5"))
+
+def snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json") if SNAPSHOT_DIR else None
+
+# Product catalog snapshot, refreshed in the background
+catalog = Catalog(products, snapshot_path=snapshot_path("catalog"))
+
+# Per-product rating summaries, updated as reviews arrive
+review_summaries = ReviewSummaries(reviews, snapshot_path=snapshot_path("review_summaries"))
+
+# Ranked keyword search over review text, updated as reviews arrive
+review_search = ReviewSearch(reviews, lexicon.current.combined_map)
+
+# Last product (or products) each chat session asked about, for follow-up questions
+SESSION_COOKIE = "isvaryam_session"
+sessions = make_session_store(os.environ.get("SESSION_REDIS_URL"))
+
+# Every answered turn, for finding unmatched queries and alias candidates (query_report.py);
+# QUERY_LOG is "mongo" (the query_log collection), "off", or a JSON-lines file path such as
+# logs/queries-{pid}.jsonl ({pid} keeps gunicorn workers apart). In MongoDB, records expire after
+# QUERY_LOG_DAYS, by default the span recommendations read
+QUERY_LOG = os.environ.get("QUERY_LOG", "mongo")
+QUERY_LOG_DAYS = float(os.environ.get("QUERY_LOG_DAYS", RECOMMEND_LOG_DAYS))
+if QUERY_LOG == "off":
+    query_log = None
+elif QUERY_LOG == "mongo":
+    query_log = QueryLog(MongoSink(mongo.collection("query_log"), QUERY_LOG_DAYS))
+else:
+    query_log = QueryLog(FileSink(QUERY_LOG))
+
+# "Customers also buy" lists from products reviewed by the same customer and asked about in one
+# session (the latter from the query log when it is in MongoDB, and from this worker's live sessions)
+recommendations = Recommendations(reviews, products, mongo.collection("query_log") if QUERY_LOG == "mongo" else None,
+                                  snapshot_path=snapshot_path("recommendations"))
+
+# Rendered catalog answers, dropped whenever the catalog, review summaries, lexicon or recommendations change
+fragment_cache = FragmentCache()
+
+# Intent and product resolved for each recently seen normalized message, dropped whenever the catalog or lexicon changes
+resolution_memo = Memo("resolution")
+
+BATCH_MAX_MESSAGES = int(os.environ.get("BATCH_MAX_MESSAGES", "5000"))
+
+_started_pid = None
+_start_lock = threading.Lock()
+
+def create_indexes():
+    # Indexes backing paginated review reads and expiring the query log; a read-only user simply skips this
+    try:
+        ensure_indexes(reviews)
+    except PyMongoError as e:
+        app.logger.warning(f"Could not create review indexes: {str(e)}")
+    if QUERY_LOG == "mongo":
+        try:
+            query_log.sink.ensure_indexes()
+        except PyMongoError as e:
+            app.logger.warning(f"Could not create the query log TTL index: {str(e)}")
+
+def start_data_layer():
+    """Start loading catalog and review data in this process; a no-op once started"""
+    global _started_pid
+    if _started_pid == os.getpid():
+        return
+    with _start_lock:
+        if _started_pid == os.getpid():
+            return
+        catalog.start()
+        review_summaries.start()
+        review_search.start()
+        lexicon.start()
+        recommendations.start()
+        if query_log is not None:
+            query_log.start()
+        threading.Thread(target=create_indexes, name="create-indexes", daemon=True).start()
+        _started_pid = os.getpid()
+
+def data_available():
+    return catalog.has_data() and review_summaries.has_data()
+
+def log_unavailable(where, e):
+    # Calls turned away by the open breaker are counted in metrics, not logged one by one
+    if not isinstance(e, CircuitOpenError):
+        app.logger.warning(f"Reviews unavailable in {where}: {str(e)}")
+
+def data_stale():
+    """True while catalog and review answers may lag the database (breaker open or refreshes failing)"""
+    return mongo_breaker.state == "open" or catalog.stale or review_summaries.stale or review_search.stale
+
+def wait_for_data(timeout=STARTUP_WAIT):
+    """Start the data layer and wait up to timeout for catalog and review data (snapshot or live)"""
+    start_data_layer()
+    deadline = time.monotonic() + timeout
+    for state in (catalog, review_summaries):
+        state.wait(max(0, deadline - time.monotonic()))
+    return data_available()
+
+@app.before_request
+def ensure_data_layer():
+    if request.endpoint in ("ready", "static"):
+        return
+    if not data_available():
+        wait_for_data()
 
 # Helper functions
-def is_invalid_query(user_input):
+@metrics.timed("scan_input")
+def scan_input(user_input):
+    """Run the keyword automaton over a normalized message once"""
+    return lexicon.current.intent_matcher.scan(user_input)
+
+def is_invalid_query(user_input, matches=None):
     """Check if query contains offensive/unrelated terms"""
-    words = set(re.findall(r'\w+', user_input.lower()))
-    return bool(words & OFFENSIVE_KEYWORDS or words & UNRELATED_KEYWORDS)
+    if matches is None:
+        matches = scan_input(user_input)
+    return matches.has("offensive") or matches.has("unrelated")
 
 def get_greeting():
     hour = datetime.now().hour
@@ -126,386 +369,904 @@ def get_greeting():
 def get_random_response(responses):
     return random.choice(responses)
 
-def get_all_prices():
-    all_items = products.find()
+def link_for(name):
+    return lexicon.current.product_links.get(name, "https://isvaryam.com")
+
+def get_all_prices(snapshot):
     price_lines = []
-    for item in all_items:
+    for item in snapshot.products:
         name = item.get("name", "Product").title()
         prices = [f"{q['size']} - ₹{q['price']}" for q in item.get("quantities", [])]
-        product_link = product_links.get(name.lower(), "https://isvaryam.com")
+        product_link = link_for(name.lower())
         price_lines.append(f"💰 <b>{name}</b>: {', '.join(prices)} <a href='{product_link}' target='_blank'>[Buy Now]</a>")
     return "<br><br>".join(price_lines)
 
-def get_all_benefits():
-    all_items = products.find()
+def get_all_benefits(snapshot):
     benefit_lines = []
-    for item in all_items:
+    for item in snapshot.products:
         name = item.get("name", "Product").lower()
-        benefits = product_benefits.get(name, [
+        benefits = lexicon.current.product_benefits.get(name, [
             "100% natural and chemical-free",
             "Made with traditional methods",
             "Rich in nutrients and health benefits",
             "Premium quality product"
         ])
-        product_link = product_links.get(name, "https://isvaryam.com")
+        product_link = link_for(name)
         benefit_lines.append(f"🌟 <b>{name.title()}</b>:<br>- " + "<br>- ".join(benefits) + f"<br><a href='{product_link}' target='_blank'>[View Product]</a>")
     return "<br><br>".join(benefit_lines)
 
-def translate_tanglish_to_english(user_input):
+@metrics.timed("translate_tanglish_to_english")
+def translate_tanglish_to_english(user_input, matches=None):
     """Convert Tanglish terms to standard product names"""
-    user_input = user_input.lower()
+    if matches is None:
+        matches = scan_input(user_input)
     
     # First check for exact matches
-    for tanglish, english in combined_map.items():
-        if tanglish in user_input:
-            return english
-    
-    # Then check for partial matches with word boundaries
-    words = re.findall(r'\b\w+\b', user_input)
-    for word in words:
-        if word in combined_map:
-            return combined_map[word]
+    vocab = lexicon.current
+    # Skips terms a lexicon reload removed since matches was scanned
+    tanglish = [t for t in matches.keywords("tanglish") if t in vocab.tanglish_order]
+    if tanglish:
+        return vocab.combined_map[min(tanglish, key=vocab.tanglish_order.get)]
     
     # Check for common oil terms
-    oil_terms = ["oil", "ennai", "taila", "thailam"]
-    if any(term in user_input for term in oil_terms):
-        if "kadalai" in user_input or "peanut" in user_input or "groundnut" in user_input:
-            return "groundnut oil"
-        elif "thengai" in user_input or "coconut" in user_input:
-            return "coconut oil"
-        elif "chekku" in user_input or "gingelly" in user_input or "nalla" in user_input or "gingerly" in user_input:
-            return "sesame oil"
-        elif "isvaryam" in user_input:
+    if matches.has("oil_term"):
+        for english, _ in TANGLISH_OIL_HINTS:
+            if matches.has(f"tanglish:{english}"):
+                return english
+        if matches.has("brand"):
             return None  # Let the main logic handle brand-specific queries
     
     # Check for other product terms
-    if "sakkarai" in user_input or "vellam" in user_input or "karupatti" in user_input:
-        return "jaggery powder"
-    elif "nei" in user_input or "ghee" in user_input or "thuppa" in user_input:
-        return "ghee"
+    for english, _ in TANGLISH_PRODUCT_HINTS:
+        if matches.has(f"tanglish:{english}"):
+            return english
     
     return None
 
-def extract_product_name(user_input):
+@metrics.timed("extract_product_name")
+def extract_product_name(user_input, snapshot, matches=None):
     """Extract product name from user input with Tanglish support and security checks"""
-    if is_invalid_query(user_input):
-        return None
+    return match_product(user_input, snapshot, matches)[0]
+
+def match_product(user_input, snapshot, matches=None):
+    """(product name or None, how it matched: "alias", "exact", "fuzzy" or None)"""
+    if matches is None:
+        matches = scan_input(user_input)
+
+    if is_invalid_query(user_input, matches):
+        return None, None
         
     # First try Tanglish translation
-    translated = translate_tanglish_to_english(user_input)
+    translated = translate_tanglish_to_english(user_input, matches)
     if translated:
-        return translated
+        return translated, "alias"
     
     # Then check for exact product names
-    user_input = user_input.lower()
-    for pname in product_name_to_id.keys():
+    for pname in snapshot.product_name_to_id.keys():
         if pname in user_input:
-            return pname
-    
-    # Check for partial matches with word boundaries
-    words = re.findall(r'\b\w+\b', user_input)
-    for word in words:
-        if word in combined_map:
-            return combined_map[word]
+            return pname, "exact"
     
     # Check for generic oil queries only if brand is mentioned
-    if "oil" in user_input and ("isvaryam" in user_input or "your" in user_input or "product" in user_input):
-        if "groundnut" in user_input or "peanut" in user_input:
-            return "groundnut oil"
-        elif "coconut" in user_input:
-            return "coconut oil"
-        elif "sesame" in user_input or "gingelly" in user_input:
-            return "sesame oil"
-        elif "ghee" in user_input:
-            return "ghee"
-        elif "jaggery" in user_input or "sugar" in user_input:
-            return "jaggery powder"
-        elif "combo" in user_input or "pack" in user_input:
-            return "super pack"
+    if matches.has("oil") and matches.has("brand_context"):
+        for english, _ in BRAND_OIL_HINTS:
+            if matches.has(f"brand_oil:{english}"):
+                return english, "alias"
     
     # Fuzzy match product info
-    all_product_names = list(ingredients_data.keys()) + list(combined_map.keys())
-    words = user_input.split()
-    matched = get_close_matches(" ".join(words), all_product_names, n=1, cutoff=0.6)
-    pname = matched[0] if matched else None
+    pname = fuzzy_product_name(user_input.split())
+    if pname:
+        return lexicon.current.combined_map.get(pname, pname), "fuzzy"
+    
+    return None, None
+
+@metrics.timed("fuzzy_product_name")
+def fuzzy_product_name(words):
+    """Closest product name or alias to the whole message, else to any single word"""
+    index = lexicon.current.product_name_index
+    pname = index.best(" ".join(words), cutoff=0.6)
     if not pname:
         for word in words:
-            match = get_close_matches(word, all_product_names, n=1, cutoff=0.8)
-            if match:
-                pname = match[0]
+            pname = index.best(word, cutoff=0.8)
+            if pname:
                 break
-    
+    return pname
+
+def extract_product_names(user_input, snapshot, matches=None, explicit=False):
+    """Every catalog product the message names, in order of first mention; explicit skips aliases ("sugar", "combo")"""
+    if matches is None:
+        matches = scan_input(user_input)
+    known = lexicon.current.product_mentions
+    # Skips terms a lexicon reload removed since matches was scanned
+    mentions = [(h.start, h.end, known[h.keyword]) for h in matches.groups.get("product", ())
+                if h.keyword in known and (not explicit or h.keyword == known[h.keyword])]
+    # Catalog products the mention table does not know yet
+    for name in snapshot.product_name_to_id:
+        if name not in known:
+            start = user_input.find(name)
+            if start >= 0:
+                mentions.append((start, start + len(name), name))
+
+    # Longest mention wins where they overlap ("coconut oil" over "coconut")
+    names, end = [], 0
+    for start, stop, name in sorted(mentions, key=lambda m: (m[0], m[0] - m[1])):
+        if start >= end:
+            end = stop
+            if name not in names and snapshot.find(name):
+                names.append(name)
+    return names
+
+def render_product_benefits(pname):
+    benefits = lexicon.current.product_benefits.get(pname, [
+        "100% natural and chemical-free",
+        "Made with traditional methods",
+        "Rich in nutrients and health benefits",
+        "Premium quality product"
+    ])
+    product_link = link_for(pname)
+    return (
+        f"🌟 Benefits of {pname.title()}:<br>- " + 
+        "<br>- ".join(benefits) + 
+        f"<br><br><a href='{product_link}' target='_blank'>[View Product Details]</a>"
+    )
+
+def render_product_rating(pname, summary):
+    product_link = link_for(pname)
+    if summary:
+        return (
+            f"⭐ Average rating for {pname.title()}: {round(summary.average,1)}/5 based on {summary.count} reviews.<br>" +
+            f"<a href='{product_link}' target='_blank'>[View Product]</a>"
+        )
+    return (
+        f"⚠️ No ratings available for {pname.title()}. " +
+        f"<a href='{product_link}' target='_blank'>[Be the first to review]</a>"
+    )
+
+def render_related(db_name):
+    """'Customers also buy' links for a product, or None; the lexicon's list until there is enough data"""
+    related = recommendations.get(db_name, lexicon.current.recommendations.get(db_name, []))
+    if not related:
+        return None
+    related_links = []
+    for r in related:
+        r_link = link_for(r)
+        related_links.append(f"<a href='{r_link}' target='_blank'>{r.title()}</a>")
+    return f"🤝 Customers also buy: {', '.join(related_links)}"
+
+def render_product_info(db_name, item, wants):
+    """Price/ingredient/image/benefit blocks for one product; wants is the set of requested blocks"""
+    response_parts = []
+    product_link = link_for(db_name)
+
+    if "price" in wants:
+        prices = [f"{q['size']} - ₹{q['price']}" for q in item.get("quantities", [])]
+        response_parts.append(f"🛒 {db_name.title()} Prices: {', '.join(prices)} <a href='{product_link}' target='_blank'>[Buy Now]</a>")
+
+    if "ingredient" in wants:
+        if db_name in ingredients_data:
+            ingredients = ", ".join(ingredients_data[db_name])
+            response_parts.append(f"🧾 Ingredients of {db_name.title()}: {ingredients}")
+        else:
+            response_parts.append(f"ℹ️ {db_name.title()} is a natural product.")
+
+    if "image" in wants:
+        imgs = item.get("images", [])[:3]
+        if imgs:
+            img_html = " ".join([f"<img src='{img}' width='100' style='margin:5px;'/>" for img in imgs])
+            response_parts.append(f"📸 Images of {db_name.title()}:<br>{img_html}")
+
+    if "benefit" in wants:
+        benefits = lexicon.current.product_benefits.get(db_name, [
+            "100% natural and chemical-free",
+            "Made with traditional methods",
+            "Rich in nutrients and health benefits",
+            "Premium quality product"
+        ])
+        response_parts.append(f"🌟 Benefits of {db_name.title()}:<br>- " + "<br>- ".join(benefits))
+
+    if not response_parts:
+        desc = item.get("description", "This is a premium product made with care.")
+        response_parts.append(f"📝 {db_name.title()}: {desc}")
+
+    # Always include product link at the end
+    response_parts.append(f"<a href='{product_link}' target='_blank'>[View Product Details]</a>")
+
+    related = render_related(db_name)
+    if related:
+        response_parts.append(related)
+
+    return "<br><br>".join(response_parts)
+
+def render_comparison(snapshot, names, wants):
+    """Side-by-side price/benefit/ingredient/rating blocks for several products"""
+    items = {name: snapshot.find(name) for name in names}
+    links = [f"<a href='{link_for(name)}' target='_blank'>{name.title()}</a>"
+             for name in names]
+    parts = [f"⚖️ <b>{' vs '.join(name.title() for name in names)}</b>"]
+
+    if "price" in wants:
+        lines = []
+        for name, item in items.items():
+            prices = [f"{q['size']} - ₹{q['price']}" for q in item.get("quantities", [])]
+            lines.append(f"- {name.title()}: {', '.join(prices) or 'Price not available'}")
+        parts.append("🛒 Prices:<br>" + "<br>".join(lines))
+
+    if "benefit" in wants:
+        lines = [f"- {name.title()}: {'; '.join(lexicon.current.product_benefits.get(name, ['100% natural and chemical-free']))}" for name in names]
+        parts.append("🌟 Benefits:<br>" + "<br>".join(lines))
+
+    if "ingredient" in wants:
+        lines = [f"- {name.title()}: {', '.join(ingredients_data.get(name, ['Natural product']))}" for name in names]
+        parts.append("🧾 Ingredients:<br>" + "<br>".join(lines))
+
+    if "rating" in wants:
+        lines = []
+        for name, item in items.items():
+            summary = review_summaries.get(item["_id"])
+            lines.append(f"- {name.title()}: {round(summary.average, 1)}/5 ({summary.count} reviews)" if summary
+                         else f"- {name.title()}: No reviews yet")
+        parts.append("⭐ Ratings:<br>" + "<br>".join(lines))
+
+    parts.append("🔗 " + " | ".join(links))
+    return "<br><br>".join(parts)
+
+def render_all_ratings(snapshot):
+    response_lines = []
+    for pid, pname in snapshot.product_map.items():
+        summary = review_summaries.get(pid)
+        product_link = link_for(pname.lower())
+        if summary:
+            response_lines.append(
+                f"⭐ {pname.title()}: {round(summary.average, 1)}/5 ({summary.count} reviews) " +
+                f"<a href='{product_link}' target='_blank'>[View Product]</a>"
+            )
+        else:
+            response_lines.append(
+                f"⭐ {pname.title()}: No reviews yet " +
+                f"<a href='{product_link}' target='_blank'>[Be the first to review]</a>"
+            )
+    return "<br><br>".join(response_lines)
+
+def cached(snapshot, key, render):
+    """Fragment for a catalog answer, rendered at most once per catalog/review/lexicon/recommendations version"""
+    version = (snapshot.version, review_summaries.version, lexicon.generation, recommendations.version)
+    return fragment_cache.get(key, version, render)
+
+def fragment_response(fragment):
+    """Serve a cached Fragment with ETag, Cache-Control and compression"""
+    status, body, headers = negotiate(fragment, request.if_none_match, request.accept_encodings)
+    return Response(body, status=status, headers=headers)
+
+def review_search_topic(user_input):
+    """(asking word, topic) for 'reviews about <topic>' style questions, else None"""
+    match = REVIEW_SEARCH_RE.search(user_input)
+    return match.groups() if match else None
+
+def render_review_search(user_input, pname, snapshot):
+    kind, topic = review_search_topic(user_input)
+    product_id = snapshot.product_name_to_id.get(pname) if pname else None
+    # Complaints are the lower-rated reviews
+    hits = review_search.search(topic, product_id=product_id, max_rating=3 if kind.startswith("complaint") else None)
+    label = f" for {pname.title()}" if product_id else ""
+    if not hits:
+        return dict(response=f"No reviews{label} mention <b>{html.escape(topic)}</b> yet.")
+    lines = []
+    for r in hits:
+        line = f"🗣️ {r['review']} ({r.get('rating', 0)}/5)"
+        if not product_id:
+            line += f" - {snapshot.product_map.get(str(r.get('productId')), 'Unknown Product').title()}"
+        lines.append(line)
+    return dict(response=f"<b>Reviews{label} about {html.escape(topic)}:</b><br>" + "<br>".join(lines))
+
+def is_follow_up(user_input, matches):
+    """True for messages like "how much?" or "and reviews?" that only make sense about an earlier product
+
+    The exact catalog-wide questions ("price", "benefits") are not follow-ups:
+    they ask for the whole list whatever was asked before.
+    """
+    if user_input in PRICE_LIST_QUERIES or user_input in BENEFIT_LIST_QUERIES:
+        return False
+    if not any(matches.has(block) for block in FOLLOW_UP_BLOCKS):
+        return False
+    return all(word in FOLLOW_UP_WORDS or word.rstrip("s") in FOLLOW_UP_WORDS for word in re.findall(r"[a-z']+", user_input))
+
+def route(user_input, snapshot, matches=None, context=None):
+    """Resolve (intent, product, match method) for a normalized message, in rule priority order
+
+    context is the session's last SessionContext; follow-up questions reuse its product.
+    """
+    if matches is None:
+        matches = scan_input(user_input)
+
+    if is_invalid_query(user_input, matches):
+        return "invalid", None, "blocked"
+
+    if context and is_follow_up(user_input, matches):
+        return context.intent, context.product, "follow_up"
+
+    search = review_search_topic(user_input)
+    if search:
+        pname = extract_product_name(user_input, snapshot, matches)
+        if set(review_search.tokenize(search[1])) - set(review_search.tokenize(pname or "")):
+            return "review_search", pname, "search"
+
+    if matches.has("brand") and matches.has("about"):
+        return "about", None, "keyword"
+
+    if user_input in PRICE_LIST_QUERIES:
+        return "all_prices", None, "keyword"
+
+    if user_input in BENEFIT_LIST_QUERIES:
+        return "all_benefits", None, "keyword"
+
+    for intent in SIMPLE_INTENTS:
+        if matches.has(intent):
+            return intent, None, "keyword"
+
+    # "ghee or sugar" and "ghee coconut oil price" ask for two products; "sugar free ghee" is about ghee
+    names = extract_product_names(user_input, snapshot, matches)
+    if len(names) > 1:
+        explicit = extract_product_names(user_input, snapshot, matches, explicit=True)
+        if matches.has("compare") or len(explicit) > 1:
+            return "compare", tuple(names), "mention"
+        if explicit:
+            return "product", explicit[0], "exact"
+
+    pname, method = match_product(user_input, snapshot, matches)
     if pname:
-        return combined_map.get(pname, pname)
-    
-    return None
+        return "product", pname, method
+
+    if matches.has("all_reviews"):
+        return "all_reviews", None, "keyword"
+
+    if matches.has("all_ratings"):
+        return "all_ratings", None, "keyword"
+
+    return "default", None, "default"
+
+@app.route("/metrics")
+def metrics_endpoint():
+    body, content_type = metrics.exposition()
+    return Response(body, content_type=content_type)
+
+@app.route("/ready")
+def ready():
+    """200 once this worker has loaded live catalog and review data, 503 until then"""
+    start_data_layer()
+    states = (catalog, review_summaries, review_search)
+    live = all(state.source == "live" for state in states)
+    data = {state.name: state.status() for state in states + (lexicon, recommendations)}
+    return jsonify(ready=live, data=data, mongo_breaker=mongo_breaker.status(),
+                   resolution_memo=resolution_memo.status()), 200 if live else 503
 
 @app.route("/")
 def index():
     return render_template("index.html")
 
-@app.route("/chatbot", methods=["POST"])
-def chatbot():
-    try:
-        user_input = request.json.get("message", "").lower().strip()
+Turn = namedtuple("Turn", "user_input matches intent product method")
 
-        # Block invalid queries immediately
-        if is_invalid_query(user_input):
-            return jsonify(
-                response=get_random_response(PRODUCT_GUIDANCE_RESPONSES),
-                status=200
-            )
+# A message's turn without session context, and whether a session's context would make it a follow-up
+Resolution = namedtuple("Resolution", "turn follow_up")
 
-        # Handle "isvaryam" or "about isvaryam" queries
-        if "isvaryam" in user_input and ("about" in user_input or "what" in user_input or "who" in user_input or "tell me" in user_input):
-            about_responses = [
-                "We are Isvaryam, offering premium natural products including: Groundnut Oil, Coconut Oil, Sesame Oil, Ghee, Jaggery Powder, and our Super Pack (1L each of 3 oils).",
-                "Isvaryam specializes in high-quality natural products. Our range includes: Groundnut Oil, Coconut Oil, Sesame Oil, Ghee, Jaggery Powder, and a Super Pack combo.",
-                "At Isvaryam, we sell these authentic products: Groundnut Oil, Coconut Oil, Sesame Oil, Ghee, Jaggery Powder, and our popular Super Pack."
-            ]
-            return jsonify(response=get_random_response(about_responses))
-
-        # Handle simple price query
-        if user_input in ["price", "prices", "price details", "cost", "rate"]:
-            return jsonify(response=f"Here are all our product prices:<br><br>{get_all_prices()}")
-
-        # Handle simple benefits query
-        if user_input in ["benefits", "benefit", "product benefits", "health benefits", "advantages"]:
-            return jsonify(response=f"Here are the benefits of all our products:<br><br>{get_all_benefits()}")
-
-        # Expanded greeting responses
-        greetings = ["hi", "hello", 
-                    "hey", "yo", "hola", "what's up", "greetings", "hi there", 
-                    "hello there", "hey there", "hiya", "howdy"]
-        
-        greeting_responses = [
-            f"{get_greeting()}! I'm Isvaryam's helpful assistant. How can I serve you today?",
-            f"{get_greeting()}! Welcome to Isvaryam. What can I help you with?",
-            f"{get_greeting()}! I'm here to assist with your Isvaryam product queries. How may I help?",
-            f"{get_greeting()}! Ready to explore Isvaryam's natural products? What would you like to know?"
+def normalize_message(user_input):
+    """The form of a message routing sees (normalize.py), with the current lexicon's spelling variants"""
+    return normalize(user_input, lexicon.current.spellings)
+
+def memo_version(snapshot):
+    """What a resolution depends on besides the message: the catalog's product names and the lexicon"""
+    return (snapshot.version, lexicon.generation)
+
+def route_message(text, snapshot):
+    """Resolution of a normalized message by the keyword rules alone"""
+    matches = scan_input(text)
+    turn = Turn(text, matches, *route(text, snapshot, matches))
+    return Resolution(turn, turn.intent != "invalid" and is_follow_up(text, matches))
+
+def settle(resolutions, version):
+    """Give freshly routed resolutions the classifier fallback, in one call, and memoize them"""
+    turns = classify_unrouted([resolution.turn for resolution in resolutions])
+    resolutions = [resolution._replace(turn=turn) for resolution, turn in zip(resolutions, turns)]
+    for resolution in resolutions:
+        resolution_memo.put(resolution.turn.user_input, version, resolution)
+    return resolutions
+
+def in_context(resolution, context):
+    """A session's turn: a follow-up question is about the product of the session's last one"""
+    if context and resolution.follow_up:
+        return resolution.turn._replace(intent=context.intent, product=context.product, method="follow_up")
+    return resolution.turn
+
+def resolve(user_input, snapshot, context=None, fallback=True):
+    """Normalize and route one message, then apply the session's context
+
+    Resolutions are memoized by normalized text, so a repeated phrasing skips
+    scanning, routing and the classifier; the context is applied afterwards
+    and reply text is picked by answer(), so neither is ever memoized.
+    fallback=False leaves rule misses at "default" and bypasses the memo.
+    """
+    version = memo_version(snapshot)
+    text = normalize_message(user_input)
+    if not fallback:
+        return in_context(route_message(text, snapshot), context)
+    resolution = resolution_memo.get(text, version) or settle([route_message(text, snapshot)], version)[0]
+    return in_context(resolution, context)
+
+@metrics.timed("classify_unrouted")
+def classify_unrouted(turns):
+    """Turns with the ones the rules left at "default" given the classifier's intent, when it is confident
+
+    All such messages are scored together, so a batch costs one matrix multiply.
+    """
+    misses = [i for i, turn in enumerate(turns) if turn and turn.intent == "default" and turn.user_input]
+    if intent_classifier is None or not misses:
+        return turns
+    turns = list(turns)
+    for i, (intent, score) in zip(misses, intent_classifier.classify([turns[i].user_input for i in misses])):
+        metrics.CLASSIFIER_RESULTS.labels(intent or "rejected").inc()
+        if intent:
+            turns[i] = turns[i]._replace(intent=intent, method="classifier")
+    return turns
+
+def record_turn(endpoint, turn, seconds=None, session_id=None):
+    """Metrics and a query log record for one answered message (turn is None if it failed to resolve)"""
+    metrics.observe_turn(endpoint, turn, seconds)
+    if query_log is None or turn is None:
+        return
+    query_log.log({
+        "at": datetime.now(timezone.utc),
+        "endpoint": endpoint,
+        "input": turn.user_input,
+        "intent": turn.intent,
+        "product": list(turn.product) if isinstance(turn.product, tuple) else turn.product,
+        "method": turn.method,
+        "latency_ms": round(seconds * 1000, 3) if seconds is not None else None,
+        "session": session_ref(session_id) if session_id else None,
+    })
+
+def session_ref(session_id):
+    """Stable stand-in for a session id in the query log, so the cookie value itself is never stored"""
+    return hashlib.sha256(session_id.encode()).hexdigest()[:16]
+
+def session_id_for(token):
+    """The client's session token if it looks like one of ours, else a new one"""
+    if token and isinstance(token, str) and len(token) <= 64:
+        return token
+    return secrets.token_urlsafe(16)
+
+def remember(session_id, turn):
+    """Keep the products a turn was about as the session's context, and count them for recommendations"""
+    if turn.intent in ("product", "compare"):
+        sessions.set(session_id, SessionContext(turn.intent, turn.product))
+        names = turn.product if isinstance(turn.product, tuple) else (turn.product,)
+        recommendations.observe(session_id, [lexicon.current.combined_map.get(name, name) for name in names])
+
+def review_sort(matches):
+    if matches.has("sort_highest"):
+        return "highest"
+    if matches.has("sort_newest"):
+        return "newest"
+    return "oldest"
+
+def review_pages(turn, snapshot):
+    """First review pages answering a turn needs, as (product ObjectId or None, sort) keys"""
+    sort = review_sort(turn.matches)
+    if turn.intent == "all_reviews":
+        return [(None, sort)]
+    if turn.intent == "product" and turn.matches.has("reviews") and not turn.matches.has("benefit_question"):
+        prod_id = snapshot.product_name_to_id.get(turn.product)
+        return [(ObjectId(prod_id), sort)] if prod_id else []
+    return []
+
+def with_next(payload, next_token, product, sort):
+    """Add the next-page token, and the /reviews URL of that page, to a review reply when there are more reviews"""
+    if next_token:
+        args = {"product": product} if product else {}
+        payload["next"] = next_token
+        payload["more"] = "/reviews?" + urlencode({**args, "sort": sort, "after": next_token})
+    return payload
+
+def answer(turn, snapshot, loader):
+    """Reply for a routed turn: a cached Fragment or a dict of JSON fields"""
+    user_input, matches, intent, pname, _ = turn
+
+    # Block invalid queries immediately
+    if intent == "invalid":
+        return dict(
+            response=get_random_response(PRODUCT_GUIDANCE_RESPONSES),
+            status=200
+        )
+
+    # Handle "isvaryam" or "about isvaryam" queries
+    if intent == "about":
+        about_responses = [
+            "We are Isvaryam, offering premium natural products including: Groundnut Oil, Coconut Oil, Sesame Oil, Ghee, Jaggery Powder, and our Super Pack (1L each of 3 oils).",
+            "Isvaryam specializes in high-quality natural products. Our range includes: Groundnut Oil, Coconut Oil, Sesame Oil, Ghee, Jaggery Powder, and a Super Pack combo.",
+            "At Isvaryam, we sell these authentic products: Groundnut Oil, Coconut Oil, Sesame Oil, Ghee, Jaggery Powder, and our popular Super Pack."
         ]
+        return dict(response=get_random_response(about_responses))
 
-        # Expanded silly/fun responses
-        silly_queries = ["are you real", "can i marry you", "what's your name", "do you love me", 
-                        "you single", "can you cook", "sing a song", "tell a joke", "you look nice", 
-                        "you cute", "what is 0/0", "do you sleep", "are you ai", "how are you", 
-                        "how do you know this", "what are you", "who made you", "are you human",
-                        "do you dream", "what do you eat", "your age", "how old are you"]
-        
-        silly_responses = [
-            "😄 I'm just a virtual assistant here to talk about Isvaryam's wonderful products!",
-            "🤖 I'm a chatbot focused on oils and natural products - let's keep it professional!",
-            "😊 While I appreciate the chat, I'm here to help with product queries. What would you like to know?",
-            "💡 I exist to share information about Isvaryam's natural products. How can I assist you?"
+    # Handle simple price query
+    if intent == "all_prices":
+        return cached(snapshot, ("all_prices",),
+                      lambda: f"Here are all our product prices:<br><br>{get_all_prices(snapshot)}")
+
+    # Handle simple benefits query
+    if intent == "all_benefits":
+        return cached(snapshot, ("all_benefits",),
+                      lambda: f"Here are the benefits of all our products:<br><br>{get_all_benefits(snapshot)}")
+
+    # Expanded greeting responses
+    greeting_responses = [
+        f"{get_greeting()}! I'm Isvaryam's helpful assistant. How can I serve you today?",
+        f"{get_greeting()}! Welcome to Isvaryam. What can I help you with?",
+        f"{get_greeting()}! I'm here to assist with your Isvaryam product queries. How may I help?",
+        f"{get_greeting()}! Ready to explore Isvaryam's natural products? What would you like to know?"
+    ]
+
+    # Expanded silly/fun responses
+    silly_responses = [
+        "😄 I'm just a virtual assistant here to talk about Isvaryam's wonderful products!",
+        "🤖 I'm a chatbot focused on oils and natural products - let's keep it professional!",
+        "😊 While I appreciate the chat, I'm here to help with product queries. What would you like to know?",
+        "💡 I exist to share information about Isvaryam's natural products. How can I assist you?"
+    ]
+
+    # Handle greetings
+    if intent == "greeting":
+        return dict(response=get_random_response(greeting_responses))
+
+    # Handle silly queries
+    if intent == "silly":
+        return dict(response=get_random_response(silly_responses))
+
+    # Handle location/contact queries
+    if intent == "contact":
+        contact_response = [
+            f"📞 Phone: {contact_data['phone']}<br>"
+            f"✉️ Email: {contact_data['email']}<br>"
+            f"📍 Address: {contact_data['address']}",
+            
+            f"Here's how to reach us:<br>"
+            f"Call: {contact_data['phone']}<br>"
+            f"Email: {contact_data['email']}<br>"
+            f"Visit: {contact_data['address']}",
+            
+            f"Our contact details:<br>"
+            f"Phone: {contact_data['phone']}<br>"
+            f"Email: {contact_data['email']}<br>"
+            f"Store: {contact_data['address']}"
         ]
+        return dict(response=get_random_response(contact_response))
 
-        # Handle greetings
-        if any(greet in user_input for greet in greetings):
-            return jsonify(response=get_random_response(greeting_responses))
-
-        # Handle silly queries
-        if any(word in user_input for word in silly_queries):
-            return jsonify(response=get_random_response(silly_responses))
-
-        # Handle location/contact queries
-        if any(word in user_input for word in ["location","contact","contact isvaryam","isvaryam contact","isvaryam location","location of isvaryam", "where is isvaryam", "where is your store", "store address", 
-                                            "address", "location of company", "physical store", "visit us", 
-                                            "come to shop", "outlet", "shop location"]):
-            contact_response = [
-                f"📞 Phone: {contact_data['phone']}<br>"
-                f"✉️ Email: {contact_data['email']}<br>"
-                f"📍 Address: {contact_data['address']}",
-                
-                f"Here's how to reach us:<br>"
-                f"Call: {contact_data['phone']}<br>"
-                f"Email: {contact_data['email']}<br>"
-                f"Visit: {contact_data['address']}",
-                
-                f"Our contact details:<br>"
-                f"Phone: {contact_data['phone']}<br>"
-                f"Email: {contact_data['email']}<br>"
-                f"Store: {contact_data['address']}"
-            ]
-            return jsonify(response=get_random_response(contact_response))
-
-        # Handle delivery queries
-        if any(word in user_input for word in ["delivery","deliver", "shipping", "how many days", "when will it reach", 
-                                            "delivery time", "how fast", "dispatch", "courier", "shipment", 
-                                            "arrival time", "when delivered", "reach my home", "reach my place",
-                                            "shipping policy", "delivery options", "shipping cost", "delivery charges"]):
-            delivery_response = [
-                "🚚 We deliver to Coimbatore in 2 days and to other cities in 3–4 days.",
-                "📦 Delivery takes 2 days in Coimbatore and 3-4 days to other locations.",
-                "⏱️ Local Coimbatore orders arrive in 2 days, other cities in 3-4 days."
-            ]
-            return jsonify(response=get_random_response(delivery_response))
-
-        # Handle product list queries
-        if any(word in user_input for word in ["products","isvaryam", "what do you have", "show all", "available items", 
-                                            "list items", "what can i buy", "items available", "product catalog",
-                                            "all offerings", "complete list", "full range", "entire collection"]):
-            product_list_response = [
-                "📦 We offer: <a href='https://isvaryam.com/products/cold-pressed-groundnut-oil?sku_id=26795436' target='_blank'>Groundnut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-coconut-oil?sku_id=24459981' target='_blank'>Coconut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-sesame-oil?sku_id=26795647' target='_blank'>Sesame Oil</a>, Ghee, <a href='https://isvaryam.com/products/organic-jaggery-powder?sku_id=24463067' target='_blank'>Jaggery Powder</a>, and our <a href='https://isvaryam.com/products/super-pack-1-lt-coconut-oil-1-lt-sesame-oil-1-lt-groundnut-oil?sku_id=24633382' target='_blank'>Super Pack</a> (1L each of 3 oils).",
-                "🛍️ Our products include: <a href='https://isvaryam.com/products/cold-pressed-groundnut-oil?sku_id=26795436' target='_blank'>Groundnut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-coconut-oil?sku_id=24459981' target='_blank'>Coconut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-sesame-oil?sku_id=26795647' target='_blank'>Sesame Oil</a>, Ghee, <a href='https://isvaryam.com/products/organic-jaggery-powder?sku_id=24463067' target='_blank'>Jaggery Powder</a>, and a <a href='https://isvaryam.com/products/super-pack-1-lt-coconut-oil-1-lt-sesame-oil-1-lt-groundnut-oil?sku_id=24633382' target='_blank'>Super Pack</a> combo.",
-                "🛒 Available products: <a href='https://isvaryam.com/products/cold-pressed-groundnut-oil?sku_id=26795436' target='_blank'>Groundnut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-coconut-oil?sku_id=24459981' target='_blank'>Coconut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-sesame-oil?sku_id=26795647' target='_blank'>Sesame Oil</a>, Ghee, <a href='https://isvaryam.com/products/organic-jaggery-powder?sku_id=24463067' target='_blank'>Jaggery Powder</a>, and our popular <a href='https://isvaryam.com/products/super-pack-1-lt-coconut-oil-1-lt-sesame-oil-1-lt-groundnut-oil?sku_id=24633382' target='_blank'>Super Pack</a>."
-            ]
-            return jsonify(response=get_random_response(product_list_response))
-
-        # Extract product name with Tanglish support
-        pname = extract_product_name(user_input)
-        if pname:
-            # Handle benefit queries
-            if "benefit" in user_input or "advantage" in user_input or any(word in user_input for word in ["good for", "why use"]):
-                benefits = product_benefits.get(pname, [
-                    "100% natural and chemical-free",
-                    "Made with traditional methods",
-                    "Rich in nutrients and health benefits",
-                    "Premium quality product"
-                ])
-                product_link = product_links.get(pname, "https://isvaryam.com")
-                return jsonify(
-                    response=f"🌟 Benefits of {pname.title()}:<br>- " + 
-                    "<br>- ".join(benefits) + 
-                    f"<br><br><a href='{product_link}' target='_blank'>[View Product Details]</a>"
-                )
-
-            # Reviews intent
-            if any(word in user_input for word in ["reviews", "product reviews", "show reviews", "customer feedback", "testimonials"]):
-                prod_id = ObjectId(product_name_to_id.get(pname, ""))
-                if prod_id:
-                    revs = list(reviews.find({"productId": prod_id}))
-                    if not revs:
-                        product_link = product_links.get(pname, "https://isvaryam.com")
-                        return jsonify(response=f"No reviews yet for {pname.title()}. <a href='{product_link}' target='_blank'>Be the first to review!</a>")
-                    response_lines = [f"🗣️ {r['review']} ({r.get('rating', 0)}/5)" for r in revs]
-                    product_link = product_links.get(pname, "https://isvaryam.com")
-                    return jsonify(
-                        response=f"<b>Reviews for {pname.title()}:</b><br>" + 
-                        "<br>".join(response_lines) + 
-                        f"<br><br><a href='{product_link}' target='_blank'>[Purchase Now]</a>"
-                    )
-
-            # Rating intent
-            if "rating" in user_input:
-                prod_id = ObjectId(product_name_to_id.get(pname, ""))
-                if prod_id:
-                    product_reviews = list(reviews.find({"productId": prod_id}))
-                    if product_reviews:
-                        avg = sum([r.get("rating", 0) for r in product_reviews]) / len(product_reviews)
-                        product_link = product_links.get(pname, "https://isvaryam.com")
-                        return jsonify(
-                            response=f"⭐ Average rating for {pname.title()}: {round(avg,1)}/5 based on {len(product_reviews)} reviews.<br>" +
-                            f"<a href='{product_link}' target='_blank'>[View Product]</a>"
-                        )
-                    else:
-                        product_link = product_links.get(pname, "https://isvaryam.com")
-                        return jsonify(
-                            response=f"⚠️ No ratings available for {pname.title()}. " +
-                            f"<a href='{product_link}' target='_blank'>[Be the first to review]</a>"
-                        )
-
-            # Get product info from database
-            db_name = combined_map.get(pname, pname)
-            item = products.find_one({"name": {"$regex": db_name, "$options": "i"}})
-            if not item:
-                return jsonify(response=f"Sorry, I couldn't find information for {db_name.title()}.")
-
-            response_parts = []
-            product_link = product_links.get(db_name, "https://isvaryam.com")
-
-            if any(word in user_input for word in ["price", "cost", "rate", "how much"]):
-                prices = [f"{q['size']} - ₹{q['price']}" for q in item.get("quantities", [])]
-                response_parts.append(f"🛒 {db_name.title()} Prices: {', '.join(prices)} <a href='{product_link}' target='_blank'>[Buy Now]</a>")
-
-            if any(word in user_input for word in ["ingredient", "contains", "what is in", "made of"]):
-                if db_name in ingredients_data:
-                    ingredients = ", ".join(ingredients_data[db_name])
-                    response_parts.append(f"🧾 Ingredients of {db_name.title()}: {ingredients}")
-                else:
-                    response_parts.append(f"ℹ️ {db_name.title()} is a natural product.")
-
-            if any(word in user_input for word in ["image", "photo", "pic", "picture", "show me"]):
-                imgs = item.get("images", [])[:3]
-                if imgs:
-                    img_html = " ".join([f"<img src='{img}' width='100' style='margin:5px;'/>" for img in imgs])
-                    response_parts.append(f"📸 Images of {db_name.title()}:<br>{img_html}")
-
-            if any(word in user_input for word in ["benefit", "advantages", "features", "why choose", "good for", 
-                                                "health benefits", "nutritional value", "why use", "pros", "uses",
-                                                "how helps", "what's good", "positive effects", "nutrition", "healthy",
-                                                "wellness", "advantages of"]):
-                benefits = product_benefits.get(db_name, [
-                    "100% natural and chemical-free",
-                    "Made with traditional methods",
-                    "Rich in nutrients and health benefits",
-                    "Premium quality product"
-                ])
-                response_parts.append(f"🌟 Benefits of {db_name.title()}:<br>- " + "<br>- ".join(benefits))
-
-            if not response_parts:
-                desc = item.get("description", "This is a premium product made with care.")
-                response_parts.append(f"📝 {db_name.title()}: {desc}")
-
-            # Always include product link at the end
-            response_parts.append(f"<a href='{product_link}' target='_blank'>[View Product Details]</a>")
-
-            related = recommendations.get(db_name, [])
-            if related:
-                related_links = []
-                for r in related:
-                    r_link = product_links.get(r, "https://isvaryam.com")
-                    related_links.append(f"<a href='{r_link}' target='_blank'>{r.title()}</a>")
-                response_parts.append(f"🤝 Customers also buy: {', '.join(related_links)}")
-
-            return jsonify(response="<br><br>".join(response_parts))
-
-        # Handle all reviews request
-        if any(word in user_input for word in ["reviews", "review", "product reviews", "show reviews", "customer feedback", "testimonials"]):
-            review_list = reviews.find()
-            product_reviews = {}
-            for rev in review_list:
-                prod_id = str(rev.get("productId"))
-                prod_name = product_map.get(prod_id, "Unknown Product")
-                text = rev.get("review", "No text")
-                product_link = product_links.get(prod_name.lower(), "https://isvaryam.com")
-                product_reviews.setdefault(prod_name, []).append(
-                    f"🗣️ {text} ({rev.get('rating', 0)}/5) <a href='{product_link}' target='_blank'>[View Product]</a>"
-                )
-            response = ""
-            for pname, revs in product_reviews.items():
-                response += f"<b>{pname.title()}</b>:<br>" + "<br>".join(revs) + "<br><br>"
-            return jsonify(response=response.strip() if response else "No reviews available yet.")
-
-        # Handle all ratings request
-        if any(word in user_input for word in ["ratings", "rate all", "average rating", "all ratings"]):
-            response_lines = []
-            for pid, pname in product_map.items():
-                product_reviews = list(reviews.find({"productId": ObjectId(pid)}))
-                product_link = product_links.get(pname.lower(), "https://isvaryam.com")
-                if product_reviews:
-                    avg = sum([r.get("rating", 0) for r in product_reviews]) / len(product_reviews)
-                    response_lines.append(
-                        f"⭐ {pname.title()}: {round(avg, 1)}/5 ({len(product_reviews)} reviews) " +
-                        f"<a href='{product_link}' target='_blank'>[View Product]</a>"
-                    )
-                else:
-                    response_lines.append(
-                        f"⭐ {pname.title()}: No reviews yet " +
-                        f"<a href='{product_link}' target='_blank'>[Be the first to review]</a>"
-                    )
-            return jsonify(response="<br><br>".join(response_lines))
-
-        # Default response with more suggestions
-        default_responses = [
-            "🤖 I didn't catch that. Try asking about:<br>- Product prices<br>- Oil types<br>- How to order<br>- Delivery info<br>- Product benefits",
-            "❓ Not sure I understand. You can ask about:<br>- Specific products<br>- Ordering process<br>- Store location<br>- Product reviews<br>- Payment options",
-            "💡 Need help? Try asking about:<br>- Our product range<br>- Pricing details<br>- Health benefits<br>- How to contact us<br>- Current offers"
+    # Handle delivery queries
+    if intent == "delivery":
+        delivery_response = [
+            "🚚 We deliver to Coimbatore in 2 days and to other cities in 3–4 days.",
+            "📦 Delivery takes 2 days in Coimbatore and 3-4 days to other locations.",
+            "⏱️ Local Coimbatore orders arrive in 2 days, other cities in 3-4 days."
         ]
-        return jsonify(response=get_random_response(default_responses))
+        return dict(response=get_random_response(delivery_response))
+
+    # Handle product list queries
+    if intent == "product_list":
+        product_list_response = [
+            "📦 We offer: <a href='https://isvaryam.com/products/cold-pressed-groundnut-oil?sku_id=26795436' target='_blank'>Groundnut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-coconut-oil?sku_id=24459981' target='_blank'>Coconut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-sesame-oil?sku_id=26795647' target='_blank'>Sesame Oil</a>, Ghee, <a href='https://isvaryam.com/products/organic-jaggery-powder?sku_id=24463067' target='_blank'>Jaggery Powder</a>, and our <a href='https://isvaryam.com/products/super-pack-1-lt-coconut-oil-1-lt-sesame-oil-1-lt-groundnut-oil?sku_id=24633382' target='_blank'>Super Pack</a> (1L each of 3 oils).",
+            "🛍️ Our products include: <a href='https://isvaryam.com/products/cold-pressed-groundnut-oil?sku_id=26795436' target='_blank'>Groundnut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-coconut-oil?sku_id=24459981' target='_blank'>Coconut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-sesame-oil?sku_id=26795647' target='_blank'>Sesame Oil</a>, Ghee, <a href='https://isvaryam.com/products/organic-jaggery-powder?sku_id=24463067' target='_blank'>Jaggery Powder</a>, and a <a href='https://isvaryam.com/products/super-pack-1-lt-coconut-oil-1-lt-sesame-oil-1-lt-groundnut-oil?sku_id=24633382' target='_blank'>Super Pack</a> combo.",
+            "🛒 Available products: <a href='https://isvaryam.com/products/cold-pressed-groundnut-oil?sku_id=26795436' target='_blank'>Groundnut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-coconut-oil?sku_id=24459981' target='_blank'>Coconut Oil</a>, <a href='https://isvaryam.com/products/cold-pressed-sesame-oil?sku_id=26795647' target='_blank'>Sesame Oil</a>, Ghee, <a href='https://isvaryam.com/products/organic-jaggery-powder?sku_id=24463067' target='_blank'>Jaggery Powder</a>, and our popular <a href='https://isvaryam.com/products/super-pack-1-lt-coconut-oil-1-lt-sesame-oil-1-lt-groundnut-oil?sku_id=24633382' target='_blank'>Super Pack</a>."
+        ]
+        choice = random.randrange(len(product_list_response))
+        return cached(snapshot, ("product_list", choice), lambda: product_list_response[choice])
+
+    # Product resolved with Tanglish support
+    if intent == "product":
+        # Handle benefit queries
+        if matches.has("benefit_question"):
+            return cached(snapshot, ("product_benefits", pname), lambda: render_product_benefits(pname))
+
+        # Reviews intent
+        if matches.has("reviews"):
+            prod_id = ObjectId(snapshot.product_name_to_id.get(pname, ""))
+            if prod_id:
+                sort = review_sort(matches)
+                revs, next_token = loader.page(prod_id, sort)
+                if not revs:
+                    product_link = link_for(pname)
+                    return dict(response=f"No reviews yet for {pname.title()}. <a href='{product_link}' target='_blank'>Be the first to review!</a>")
+                response_lines = [f"🗣️ {r['review']} ({r.get('rating', 0)}/5)" for r in revs]
+                product_link = link_for(pname)
+                return with_next(dict(
+                    response=f"<b>Reviews for {pname.title()}:</b><br>" + 
+                    "<br>".join(response_lines) + 
+                    f"<br><br><a href='{product_link}' target='_blank'>[Purchase Now]</a>"
+                ), next_token, pname, sort)
+
+        # Rating intent
+        if matches.has("rating"):
+            prod_id = ObjectId(snapshot.product_name_to_id.get(pname, ""))
+            if prod_id:
+                return cached(snapshot, ("rating", pname),
+                              lambda: render_product_rating(pname, review_summaries.get(prod_id)))
+
+        # Get product info from database
+        db_name = lexicon.current.combined_map.get(pname, pname)
+        item = snapshot.find(db_name)
+        if not item:
+            return dict(response=f"Sorry, I couldn't find information for {db_name.title()}.")
+
+        wants = frozenset(block for block in ("price", "ingredient", "image", "benefit") if matches.has(block))
+        return cached(snapshot, ("product", db_name, wants),
+                      lambda: render_product_info(db_name, item, wants))
+
+    # Several products side by side; everything when no block was asked for
+    if intent == "compare":
+        wants = frozenset(block for block in ("price", "benefit", "ingredient", "rating") if matches.has(block))
+        wants = wants or frozenset(("price", "benefit", "ingredient", "rating"))
+        return cached(snapshot, ("compare", pname, wants), lambda: render_comparison(snapshot, pname, wants))
+
+    # Reviews mentioning a topic
+    if intent == "review_search":
+        return render_review_search(user_input, pname, snapshot)
+
+    # Handle all reviews request
+    if intent == "all_reviews":
+        sort = review_sort(matches)
+        review_list, next_token = loader.page(None, sort)
+        product_reviews = {}
+        for rev in review_list:
+            prod_id = str(rev.get("productId"))
+            prod_name = snapshot.product_map.get(prod_id, "Unknown Product")
+            text = rev.get("review", "No text")
+            product_link = link_for(prod_name.lower())
+            product_reviews.setdefault(prod_name, []).append(
+                f"🗣️ {text} ({rev.get('rating', 0)}/5) <a href='{product_link}' target='_blank'>[View Product]</a>"
+            )
+        response = ""
+        for pname, revs in product_reviews.items():
+            response += f"<b>{pname.title()}</b>:<br>" + "<br>".join(revs) + "<br><br>"
+        return with_next(dict(response=response.strip() if response else "No reviews available yet."), next_token, None, sort)
+
+    # Handle all ratings request
+    if intent == "all_ratings":
+        return cached(snapshot, ("all_ratings",), lambda: render_all_ratings(snapshot))
+
+    # Default response with more suggestions
+    default_responses = [
+        "🤖 I didn't catch that. Try asking about:<br>- Product prices<br>- Oil types<br>- How to order<br>- Delivery info<br>- Product benefits",
+        "❓ Not sure I understand. You can ask about:<br>- Specific products<br>- Ordering process<br>- Store location<br>- Product reviews<br>- Payment options",
+        "💡 Need help? Try asking about:<br>- Our product range<br>- Pricing details<br>- Health benefits<br>- How to contact us<br>- Current offers"
+    ]
+    return dict(response=get_random_response(default_responses))
+
+@app.route("/chatbot", methods=["POST"])
+def chatbot():
+    started = time.perf_counter()
+    turn = session_id = None
+    try:
+        user_input = request.json.get("message", "")
+        session_id = session_id_for(request.json.get("session") or request.cookies.get(SESSION_COOKIE))
+        snapshot = catalog.snapshot()
+        turn = resolve(user_input, snapshot, sessions.get(session_id))
+        remember(session_id, turn)
+        reply = answer(turn, snapshot, ReviewLoader(reviews, breaker=mongo_breaker))
+        response = fragment_response(reply) if isinstance(reply, Fragment) else jsonify(**reply)
+        if turn.intent in DATA_INTENTS and data_stale():
+            response.headers["Warning"] = STALE_WARNING
+        if session_id != request.cookies.get(SESSION_COOKIE):
+            response.set_cookie(SESSION_COOKIE, session_id, max_age=int(sessions.ttl), httponly=True, samesite="Lax")
+        return response
+
+    except PyMongoError as e:
+        log_unavailable("chatbot", e)
+        return jsonify(response=REVIEWS_UNAVAILABLE), 503
 
     except Exception as e:
         app.logger.error(f"Error in chatbot: {str(e)}")
         return jsonify(response="⚠️ Sorry, something went wrong. Please try again."), 500
 
+    finally:
+        record_turn("chatbot", turn, time.perf_counter() - started, session_id)
+
+def plan_batch(messages, snapshot):
+    """Route every message of a batch; returns (turns, review pages to prefetch)
+
+    Messages the memo misses are routed one at a time and given the classifier
+    fallback together.
+    """
+    version = memo_version(snapshot)
+    resolutions, fresh = [], []
+    for message in messages:
+        if not isinstance(message, str):
+            resolutions.append(None)
+            continue
+        try:
+            text = normalize_message(message)
+            resolution = resolution_memo.get(text, version)
+            if resolution is None:
+                resolution = route_message(text, snapshot)
+                fresh.append(len(resolutions))
+        except Exception as e:
+            app.logger.error(f"Error in chatbot batch: {str(e)}")
+            resolution = None
+        resolutions.append(resolution)
+    for i, resolution in zip(fresh, settle([resolutions[i] for i in fresh], version)):
+        resolutions[i] = resolution
+    turns = [resolution and resolution.turn for resolution in resolutions]
+
+    pages = [key for turn in turns if turn for key in review_pages(turn, snapshot)]
+    return turns, pages
+
+def answer_batch(messages, turns, snapshot, loader):
+    """Per-message results for a planned batch, in order, with per-item errors"""
+    results = []
+    stale = data_stale()
+    for message, turn in zip(messages, turns):
+        record_turn("batch", turn)
+        if turn is None:
+            error = "message must be a string" if not isinstance(message, str) else "⚠️ Sorry, something went wrong. Please try again."
+            results.append({"error": error})
+            continue
+        try:
+            reply = answer(turn, snapshot, loader)
+            result = {"response": reply.html} if isinstance(reply, Fragment) else reply
+            if stale and turn.intent in DATA_INTENTS:
+                result = {**result, "stale": True}
+            results.append(result)
+        except PyMongoError as e:
+            log_unavailable("chatbot batch", e)
+            results.append({"error": REVIEWS_UNAVAILABLE})
+        except Exception as e:
+            app.logger.error(f"Error in chatbot batch: {str(e)}")
+            results.append({"error": "⚠️ Sorry, something went wrong. Please try again."})
+    return results
+
+def batch_error(messages):
+    """Validation error (message, status) for a batch payload, or None"""
+    if not isinstance(messages, list):
+        return "'messages' must be a list of strings", 400
+    if len(messages) > BATCH_MAX_MESSAGES:
+        return f"At most {BATCH_MAX_MESSAGES} messages per batch", 413
+    return None
+
+@app.route("/chatbot/batch", methods=["POST"])
+@metrics.BATCH_SECONDS.time()
+def chatbot_batch():
+    """Answer many messages at once; each distinct first review page is read once for the whole batch"""
+    payload = request.get_json(silent=True)
+    messages = payload.get("messages") if isinstance(payload, dict) else None
+    error = batch_error(messages)
+    if error:
+        return jsonify(error=error[0]), error[1]
+
+    snapshot = catalog.snapshot()
+    turns, pages = plan_batch(messages, snapshot)
+    loader = ReviewLoader(reviews, breaker=mongo_breaker)
+    try:
+        loader.prefetch(pages)
+    except Exception as e:
+        # Items fall back to their own lookups (and report their own errors)
+        app.logger.error(f"Error prefetching reviews for batch: {str(e)}")
+    return jsonify(results=answer_batch(messages, turns, snapshot, loader))
+
+def product_arg(snapshot):
+    """Product ObjectId named by the ?product= query arg, or None; ValueError if unknown"""
+    product = request.args.get("product")
+    if not product:
+        return None
+    pname = extract_product_name(normalize_message(product), snapshot)
+    prod_id = snapshot.product_name_to_id.get(pname) if pname else None
+    if not prod_id:
+        raise ValueError(f"unknown product '{product}'")
+    return ObjectId(prod_id)
+
+def review_query_args(snapshot):
+    """(product ObjectId or None, sort, limit) from /reviews query args; ValueError if invalid"""
+    product_id = product_arg(snapshot)
+    sort = request.args.get("sort", "oldest")
+    if sort not in REVIEW_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(REVIEW_SORTS)}")
+    limit = request.args.get("limit", REVIEW_PAGE_SIZE, type=int)
+    if not 0 < limit <= 100:
+        raise ValueError("limit must be between 1 and 100")
+    return product_id, sort, limit
+
+def review_json(review, snapshot):
+    return {
+        "product": snapshot.product_map.get(str(review.get("productId")), "Unknown Product"),
+        "review": review.get("review", "No text"),
+        "rating": review.get("rating", 0),
+    }
+
+@app.route("/reviews")
+def review_page():
+    """One page of reviews: ?product=&sort=oldest|newest|highest&limit=&after="""
+    snapshot = catalog.snapshot()
+    try:
+        product_id, sort, limit = review_query_args(snapshot)
+        docs, next_token = ReviewLoader(reviews, limit, mongo_breaker).page(product_id, sort, request.args.get("after"))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except PyMongoError as e:
+        log_unavailable("reviews", e)
+        return jsonify(error="reviews are temporarily unavailable"), 503
+    return jsonify(reviews=[review_json(r, snapshot) for r in docs], next=next_token)
+
+def rating_arg(name):
+    """Float value of a rating query arg, or None when absent; ValueError if not a number"""
+    value = request.args.get(name, "")
+    if not value:
+        return None
+    try:
+        rating = float(value)
+        if math.isfinite(rating):
+            return rating
+    except ValueError:
+        pass
+    raise ValueError(f"{name} must be a number")
+
+@app.route("/reviews/search")
+def review_search_page():
+    """Reviews ranked by relevance to ?q=, optionally filtered by &product=&min_rating=&max_rating=&limit="""
+    snapshot = catalog.snapshot()
+    try:
+        product_id = product_arg(snapshot)
+        limit = request.args.get("limit", REVIEW_PAGE_SIZE, type=int)
+        if not 0 < limit <= 100:
+            raise ValueError("limit must be between 1 and 100")
+        min_rating, max_rating = rating_arg("min_rating"), rating_arg("max_rating")
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    hits = review_search.search(
+        request.args.get("q", ""), product_id=product_id, limit=limit, min_rating=min_rating, max_rating=max_rating,
+    )
+    return jsonify(reviews=[review_json(r, snapshot) for r in hits])
+
+def next_batch(cursor):
+    """The cursor's next batch of reviews (empty at the end), read as one guarded call"""
+    with mongo_breaker.guard():
+        return list(itertools.islice(cursor, REVIEW_PAGE_SIZE))
+
+@app.route("/reviews/stream")
+def review_stream():
+    """Server-sent events, one per review, for rendering long review lists progressively: ?product=&sort=&limit=&after=
+
+    A stream carries at most limit reviews. Each event id is the token of the
+    review after it, so a reconnecting EventSource resumes through
+    Last-Event-ID, and ?after= the last id continues past the limit. Every
+    batch is one breaker-guarded read under the MongoDB deadline; a read
+    failing mid-stream ends it with an error event, from which the client can
+    resume.
+    """
+    snapshot = catalog.snapshot()
+    try:
+        product_id, sort, limit = review_query_args(snapshot)
+        after = request.args.get("after") or request.headers.get("Last-Event-ID")
+        cursor = (
+            reviews.find(page_filter(product_id, sort, after), REVIEW_PROJECTION)
+            .sort(REVIEW_SORTS[sort])
+            .limit(limit)
+            .batch_size(REVIEW_PAGE_SIZE)
+        )
+        first = next_batch(cursor)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except PyMongoError as e:
+        log_unavailable("reviews stream", e)
+        return jsonify(error="reviews are temporarily unavailable"), 503
+
+    def events():
+        batch = first
+        while batch:
+            for r in batch:
+                yield f"id: {encode_token(r, sort)}\ndata: {json.dumps(review_json(r, snapshot))}\n\n"
+            try:
+                batch = next_batch(cursor)
+            except PyMongoError as e:
+                log_unavailable("reviews stream", e)
+                yield "event: error\ndata: {}\n\n"
+                return
+        yield "event: end\ndata: {}\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,154 @@
+"""Async serving mode: /chatbot and /chatbot/batch on an event loop, reviews read with Motor
+
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+
+Routing and reply building are the Flask app's own resolve()/answer(); only the
+per-request review reads differ, awaited through an AsyncReviewLoader so a slow
+database round trip never blocks the worker. The catalog snapshot and review
+summaries load at lifespan startup and keep refreshing in their background
+threads. Every other path (the page, /ready, static files) is passed to the
+Flask app.
+"""
+import asyncio
+import json
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+from werkzeug.http import dump_cookie, parse_accept_header, parse_cookie, parse_etags
+
+import app as chatbot
+import metrics
+from fragments import Fragment, negotiate
+from review_loader import AsyncReviewLoader
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+    wsgi_fallback = WsgiToAsgi(chatbot.app)
+except ImportError:
+    wsgi_fallback = None
+
+# Motor collection for review reads; created on first use inside the event loop
+reviews = None
+
+ERROR_RESPONSE = "⚠️ Sorry, something went wrong. Please try again."
+
+
+def get_reviews():
+    global reviews
+    if reviews is None:
+        # Motor runs pymongo calls on its own threads, so the breaker's deadline is set on the client
+        reviews = AsyncIOMotorClient(
+            chatbot.mongo_uri, event_listeners=[metrics.MongoCommandMetrics()],
+            timeoutMS=int(chatbot.mongo_breaker.deadline * 1000),
+        )["isvaryam"]["reviews"]
+    return reviews
+
+
+def json_body(payload):
+    # Same bytes as Flask's jsonify()
+    return (json.dumps(payload, separators=(",", ":"), sort_keys=True) + "\n").encode()
+
+
+async def handle_chat(payload, headers):
+    started = time.perf_counter()
+    turn = session_id = None
+    try:
+        user_input = payload.get("message", "")
+        cookie = parse_cookie(headers.get("cookie", "")).get(chatbot.SESSION_COOKIE)
+        session_id = chatbot.session_id_for(payload.get("session") or cookie)
+        snapshot = chatbot.catalog.snapshot()
+        turn = chatbot.resolve(user_input, snapshot, chatbot.sessions.get(session_id))
+        chatbot.remember(session_id, turn)
+        loader = AsyncReviewLoader(get_reviews(), breaker=chatbot.mongo_breaker)
+        await loader.prefetch(chatbot.review_pages(turn, snapshot))
+        reply = chatbot.answer(turn, snapshot, loader)
+    finally:
+        chatbot.record_turn("chatbot", turn, time.perf_counter() - started, session_id)
+    if isinstance(reply, Fragment):
+        status, body, response_headers = negotiate(
+            reply, parse_etags(headers.get("if-none-match")), parse_accept_header(headers.get("accept-encoding"))
+        )
+    else:
+        status, body, response_headers = 200, json_body(reply), {"Content-Type": "application/json"}
+    if turn.intent in chatbot.DATA_INTENTS and chatbot.data_stale():
+        response_headers["Warning"] = chatbot.STALE_WARNING
+    if session_id != cookie:
+        response_headers["Set-Cookie"] = dump_cookie(
+            chatbot.SESSION_COOKIE, session_id, max_age=int(chatbot.sessions.ttl), httponly=True, samesite="Lax"
+        )
+    return status, body, response_headers
+
+
+async def handle_batch(payload, headers):
+    messages = payload.get("messages") if isinstance(payload, dict) else None
+    error = chatbot.batch_error(messages)
+    if error:
+        return error[1], json_body({"error": error[0]}), {"Content-Type": "application/json"}
+
+    started = time.perf_counter()
+    snapshot = chatbot.catalog.snapshot()
+    turns, pages = chatbot.plan_batch(messages, snapshot)
+    loader = AsyncReviewLoader(get_reviews(), breaker=chatbot.mongo_breaker)
+    try:
+        await loader.prefetch(pages)
+    except Exception as e:
+        # Items needing reviews report their own errors
+        chatbot.app.logger.error(f"Error prefetching reviews for batch: {str(e)}")
+    results = chatbot.answer_batch(messages, turns, snapshot, loader)
+    metrics.BATCH_SECONDS.observe(time.perf_counter() - started)
+    return 200, json_body({"results": results}), {"Content-Type": "application/json"}
+
+
+ROUTES = {
+    "/chatbot": handle_chat,
+    "/chatbot/batch": handle_batch,
+}
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                chatbot.start_data_layer()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    handler = ROUTES.get(scope["path"]) if scope["method"] == "POST" else None
+    if handler is None:
+        if wsgi_fallback is not None:
+            return await wsgi_fallback(scope, receive, send)
+        status, body, headers = 404, json_body({"error": "Not found"}), {"Content-Type": "application/json"}
+    else:
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        if not chatbot.data_available():
+            await asyncio.get_running_loop().run_in_executor(None, chatbot.wait_for_data)
+        try:
+            payload = json.loads(await read_body(receive))
+            status, body, headers = await handler(payload, headers)
+        except PyMongoError as e:
+            chatbot.log_unavailable("chatbot", e)
+            status, body, headers = 503, json_body({"response": chatbot.REVIEWS_UNAVAILABLE}), {"Content-Type": "application/json"}
+        except Exception as e:
+            chatbot.app.logger.error(f"Error in chatbot: {str(e)}")
+            status, body, headers = 500, json_body({"response": ERROR_RESPONSE}), {"Content-Type": "application/json"}
+
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+        + [(b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
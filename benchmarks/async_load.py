@@ -0,0 +1,97 @@
+"""Concurrent load on one sync (Flask) worker vs one async (ASGI) worker
+
+    python benchmarks/async_load.py [--latency-ms 5] [--requests 400] [--concurrency 1 10 50 100]
+
+Both modes run in-process against the seeded mongomock stand-in, with
+--latency-ms of simulated round trip on every review read (time.sleep for the
+sync driver, asyncio.sleep for the Motor-style one). A sync worker serves one
+request at a time, so its numbers do not change with concurrency.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import fixtures
+
+CORPUS = [
+    "ghee reviews", "sesame oil reviews", "coconut oil customer feedback", "jaggery powder reviews",
+    "coconut oil price", "hi", "groundnut oil rating", "thengai ennai price", "delivery",
+]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_sync(app, messages):
+    client = app.app.test_client()
+    latencies = []
+    start = time.perf_counter()
+    for m in messages:
+        t = time.perf_counter()
+        client.post("/chatbot", json={"message": m})
+        latencies.append(time.perf_counter() - t)
+    return len(messages) / (time.perf_counter() - start), latencies
+
+
+async def asgi_post(application, path, payload):
+    body = json.dumps(payload).encode()
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": [(b"content-type", b"application/json")]}
+    await application(scope, receive, send)
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+async def run_async(application, messages, concurrency):
+    queue = list(messages)
+    latencies = []
+
+    async def worker():
+        while queue:
+            m = queue.pop()
+            t = time.perf_counter()
+            status, _ = await asgi_post(application, "/chatbot", {"message": m})
+            assert status == 200, status
+            latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(messages) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    raw = fixtures.install(latency=latency)
+    import app
+    import asgi
+    asgi.reviews = fixtures.AsyncCollection(raw["isvaryam"]["reviews"], latency)
+
+    rng = random.Random(0)
+    messages = [rng.choice(CORPUS) for _ in range(args.requests)]
+
+    print(f"{'mode':<6} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    rps, lat = run_sync(app, messages)
+    print(f"{'sync':<6} {1:>5} {rps:>8.0f} {percentile(lat, 0.5) * 1e3:>8.1f} {percentile(lat, 0.95) * 1e3:>8.1f}")
+    for concurrency in args.concurrency:
+        rps, lat = asyncio.run(run_async(asgi.application, messages, concurrency))
+        print(f"{'async':<6} {concurrency:>5} {rps:>8.0f} {percentile(lat, 0.5) * 1e3:>8.1f} {percentile(lat, 0.95) * 1e3:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Throughput of /chatbot/batch against looping the single /chatbot endpoint
+
+    python benchmarks/batch_throughput.py [--messages 2000] [--batch-size 500] [--latency-ms 1]
+
+Draws messages from benchmarks/corpus.json and runs through the Flask test
+client against the seeded mongomock stand-in; --latency-ms adds a simulated
+round trip to every database call. Both runs start from the same reply RNG
+seed, so every batch answer must equal its single-endpoint answer.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import fixtures
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    fixtures.install(latency=args.latency_ms / 1000)
+    import app
+    # Load everything answers read before either run, so both see the same data
+    app.wait_for_data()
+    app.recommendations.wait(app.STARTUP_WAIT)
+    # No session cookie: batch items have no session context, so singles must not either
+    client = app.app.test_client(use_cookies=False)
+
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = [q for items in json.load(f).values() for q in items]
+    rng = random.Random(0)
+    messages = [rng.choice(corpus) for _ in range(args.messages)]
+
+    random.seed(0)
+    start = time.perf_counter()
+    singles = [client.post("/chatbot", json={"message": m}).get_json() for m in messages]
+    single_time = time.perf_counter() - start
+
+    random.seed(0)
+    start = time.perf_counter()
+    batched = []
+    for i in range(0, len(messages), args.batch_size):
+        chunk = messages[i:i + args.batch_size]
+        batched += client.post("/chatbot/batch", json={"messages": chunk}).get_json()["results"]
+    batch_time = time.perf_counter() - start
+
+    errors = sum("error" in r for r in batched)
+    # Batch items carry "stale"; /chatbot sends it as a header
+    differ = sum(a != {k: v for k, v in b.items() if k != "stale"} for a, b in zip(singles, batched))
+    print(f"messages:        {len(messages)} (latency {args.latency_ms} ms per db call)")
+    print(f"single endpoint: {len(messages) / single_time:10.0f} msg/s")
+    print(f"batch endpoint:  {len(messages) / batch_time:10.0f} msg/s  (batch size {args.batch_size})")
+    print(f"speedup:         {single_time / batch_time:10.1f}x   errors: {errors}   differing answers: {differ}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Seeded in-process MongoDB stand-in, with injectable latency and failures, shared by the benchmarks
+
+Requires mongomock (``pip install mongomock``). Call ``install()`` before
+importing ``app`` so its MongoClient talks to the stand-in.
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import mongomock
+import pymongo
+from bson import ObjectId
+from pymongo import _csot  # the driver's own deadline bookkeeping, to time out like it does
+from pymongo.errors import AutoReconnect, NetworkTimeout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PRODUCTS = ["Groundnut Oil", "Coconut Oil", "Sesame Oil", "Ghee", "Jaggery Powder", "Super Pack"]
+
+REVIEW_TEXTS = [
+    "Smells fresh and natural", "Good packaging, no leaks", "Taste is like homemade", "Bit costly but worth it",
+    "Delivery was late but product is good", "Bottle was damaged in packaging", "Very aromatic, my family loves it",
+    "Thick and pure", "Not happy with the smell this time", "Best chekku ennai in Coimbatore",
+]
+
+
+def seed(client, reviews_per_product=20, users=200, rng_seed=0):
+    rng = random.Random(rng_seed)
+    db = client["isvaryam"]
+    db.products.delete_many({})
+    db.reviews.delete_many({})
+    ids = []
+    for i, name in enumerate(PRODUCTS):
+        oid = ObjectId("%024x" % (i + 1))
+        ids.append(oid)
+        db.products.insert_one({
+            "_id": oid,
+            "name": name,
+            "description": f"Isvaryam {name}, made the traditional way.",
+            "quantities": [{"size": "500ml", "price": 150 + 10 * i}, {"size": "1L", "price": 280 + 10 * i}],
+            "images": [f"https://isvaryam.com/images/{i}_{k}.jpg" for k in range(4)],
+        })
+    docs = []
+    for oid in ids:
+        for _ in range(reviews_per_product):
+            docs.append({
+                "productId": oid,
+                "userId": f"user{rng.randrange(users)}",
+                "review": rng.choice(REVIEW_TEXTS),
+                "rating": rng.randint(1, 5),
+            })
+    if docs:
+        db.reviews.insert_many(docs)
+    return db
+
+
+class Faults:
+    """Injected database behaviour, read on every call so it can change mid-run
+
+    ``latency`` seconds are added to each call and ``error_rate`` of the calls
+    fail with AutoReconnect. As with the real driver, a call that would outlast
+    the caller's ``pymongo.timeout()`` deadline fails with NetworkTimeout once
+    the deadline is used up.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, rng_seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(rng_seed)
+
+    def before_call(self):
+        remaining = _csot.remaining()
+        if remaining is not None and self.latency >= remaining:
+            time.sleep(max(remaining, 0))
+            raise NetworkTimeout("injected: deadline exceeded")
+        time.sleep(self.latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise AutoReconnect("injected: connection refused")
+
+
+class _Faulty:
+    """Proxy applying Faults before every call listed in ``calls``, like a network round trip"""
+
+    def __init__(self, target, faults, calls):
+        self._target = target
+        self._faults = faults
+        self._calls = calls
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in self._calls and callable(attr):
+            def call(*args, **kwargs):
+                self._faults.before_call()
+                return attr(*args, **kwargs)
+            return call
+        return attr
+
+    def __getitem__(self, name):
+        return _wrap(self._target[name], self._faults)
+
+
+def _wrap(target, faults):
+    if isinstance(target, mongomock.Collection):
+        return _Faulty(target, faults, {"find", "find_one", "aggregate", "insert_one", "insert_many", "count_documents"})
+    return _Faulty(target, faults, ())
+
+
+class _AsyncCursor:
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self._latency = latency
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, *args):
+        self._cursor = self._cursor.limit(*args)
+        return self
+
+    async def to_list(self, length=None):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+
+class AsyncCollection:
+    """Motor-style wrapper over a mongomock collection; the round trip is an asyncio sleep"""
+
+    def __init__(self, collection, latency=0.0):
+        self._collection = collection
+        self._latency = latency
+
+    def find(self, *args, **kwargs):
+        return _AsyncCursor(self._collection.find(*args, **kwargs), self._latency)
+
+    def aggregate(self, pipeline):
+        return _AsyncCursor(iter(self._collection.aggregate(pipeline)), self._latency)
+
+
+def install(latency=0.0, faults=None, **seed_args):
+    """Point pymongo.MongoClient at a seeded mongomock client; returns the raw client
+
+    Every call sleeps ``latency`` seconds, or follows ``faults`` (a Faults) when given.
+    """
+    os.chdir(ROOT)  # app.py opens its JSON data files relative to the working directory
+    os.environ.setdefault("SNAPSHOT_DIR", tempfile.mkdtemp(prefix="isvaryam-snapshots-"))
+    client = mongomock.MongoClient()
+    seed(client, **seed_args)
+    if faults is None and latency:
+        faults = Faults(latency)
+    served = _wrap(client, faults) if faults else client
+    pymongo.MongoClient = lambda *args, **kwargs: served
+    return client
+
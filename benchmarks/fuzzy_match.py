@@ -0,0 +1,119 @@
+"""Compare FuzzyIndex with the difflib.get_close_matches fallback it replaced
+
+    python benchmarks/fuzzy_match.py [--sizes 25 1000 5000] [--queries 300]
+
+Alias tables are the real product names plus synthetic Tanglish-like spellings.
+Both paths are run on the same typo'd queries; any disagreement is reported.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from difflib import get_close_matches
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fuzzy import FuzzyIndex  # noqa: E402
+
+SYLLABLES = ["ka", "dal", "ai", "then", "gai", "en", "nai", "chek", "ku", "nal", "la", "sak", "ka", "rai",
+             "vel", "lam", "ka", "ru", "pat", "ti", "thup", "pa", "nei", "oil", "pow", "der", "ghee"]
+
+
+def alias_table(size, rng):
+    with open(os.path.join(ROOT, "ingredients.json")) as f:
+        names = list(json.load(f).keys())
+    names += ["chekku ennai", "kadalai ennai", "thengai ennai", "nallennai", "karupatti", "panai vellam",
+              "nei", "thuppa", "combo pack", "oil combo", "brown sugar", "gingelly oil", "peanut oil"]
+    while len(names) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        names.append(word if rng.random() < 0.5 else f"{word} {rng.choice(['oil', 'ennai', 'powder'])}")
+    return list(dict.fromkeys(names))[:size]
+
+
+def typo(word, rng):
+    chars = list(word)
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.33:
+            del chars[i]
+        elif op < 0.66:
+            chars.insert(i, rng.choice("aeioulnkrt"))
+        else:
+            chars[i] = rng.choice("aeioulnkrt")
+    return "".join(chars) or word
+
+
+def queries(names, count, rng):
+    out = []
+    for _ in range(count):
+        q = typo(rng.choice(names), rng)
+        if rng.random() < 0.5:
+            q = f"{q} {rng.choice(['price', 'benefits', 'please', 'rate'])}"
+        out.append(q)
+    return out
+
+
+def difflib_path(query, names):
+    words = query.split()
+    matched = get_close_matches(" ".join(words), names, n=1, cutoff=0.6)
+    if matched:
+        return matched[0]
+    for word in words:
+        match = get_close_matches(word, names, n=1, cutoff=0.8)
+        if match:
+            return match[0]
+    return None
+
+
+def index_path(query, index):
+    words = query.split()
+    pname = index.best(" ".join(words), cutoff=0.6)
+    if not pname:
+        for word in words:
+            pname = index.best(word, cutoff=0.8)
+            if pname:
+                break
+    return pname
+
+
+def timed(fn, items):
+    results, times = [], []
+    for q in items:
+        start = time.perf_counter()
+        results.append(fn(q))
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return results, sum(times) / len(times), times[len(times) // 2], times[int(len(times) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 1000, 5000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'aliases':>8} {'build ms':>9} {'difflib us':>11} {'index us':>9} {'p50 us':>7} {'p95 us':>7} "
+          f"{'speedup':>8} {'mismatch':>9}")
+    for size in args.sizes:
+        names = alias_table(size, rng)
+        qs = queries(names, args.queries, rng)
+
+        start = time.perf_counter()
+        index = FuzzyIndex(names)
+        build = time.perf_counter() - start
+
+        expected, slow, _, _ = timed(lambda q: difflib_path(q, names), qs)
+        got, fast, p50, p95 = timed(lambda q: index_path(q, index), qs)
+        mismatches = sum(a != b for a, b in zip(expected, got))
+        print(f"{len(names):>8} {build * 1e3:>9.1f} {slow * 1e6:>11.0f} {fast * 1e6:>9.0f} {p50 * 1e6:>7.0f} "
+              f"{p95 * 1e6:>7.0f} {slow / fast:>7.1f}x {mismatches:>9}")
+
+
+if __name__ == "__main__":
+    main()
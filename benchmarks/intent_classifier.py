@@ -0,0 +1,125 @@
+"""Accuracy and latency of the fallback intent classifier
+
+    python benchmarks/intent_classifier.py [--batch 1000] [--rounds 20]
+
+Accuracy is measured on benchmarks/intent_eval.json: held-out queries written
+apart from intent_examples.json, plus out-of-scope ones labelled "default".
+Every query is routed by the keyword rules alone and by the rules plus the
+classifier; the classifier is also swept over thresholds and margins. Latency
+covers loading the artifact, one message at a time, and a whole batch in one
+call. Exits 1 if the classifier gives any held-out query a wrong intent (a
+false positive): a wrong answer is worse than the default one.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import fixtures
+import classifier
+
+EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_eval.json")
+THRESHOLDS = (0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.7)
+MARGINS = (0, 0.05, 0.1)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def accuracy(gold, predicted):
+    """(accuracy, out-of-scope queries answered with an intent); blocking an out-of-scope query is correct"""
+    predicted = ["default" if p == "invalid" else p for p in predicted]
+    correct = sum(g == p for g, p in zip(gold, predicted))
+    false_accepts = sum(g == "default" and p != "default" for g, p in zip(gold, predicted))
+    return correct / len(gold), false_accepts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, default=1000, help="messages per batch call")
+    parser.add_argument("--rounds", type=int, default=20, help="passes over the eval queries, one message per call")
+    args = parser.parse_args()
+
+    fixtures.install()
+    os.environ.setdefault("QUERY_LOG", "off")
+    os.chdir(fixtures.ROOT)
+    import app
+    snapshot = app.catalog.snapshot()
+
+    with open(EVAL_PATH) as f:
+        labelled = json.load(f)
+    texts = [text for intent, items in labelled.items() for text in items]
+    gold = [intent for intent, items in labelled.items() for _ in items]
+    out_of_scope = gold.count("default")
+
+    loads = []
+    for _ in range(20):
+        start = time.perf_counter()
+        model = classifier.load_classifier()
+        loads.append(time.perf_counter() - start)
+    size = os.path.getsize(classifier.INTENT_MODEL_PATH)
+    print(f"artifact: {len(model.labels)} intents, {len(model.vectors[0])} examples, {size / 1024:.0f} KiB, "
+          f"load p50 {percentile(loads, 0.5) * 1000:.1f} ms")
+
+    rules = [app.resolve(text, snapshot, fallback=False) for text in texts]
+    both = app.classify_unrouted(rules)
+    print(f"\n{len(texts)} held-out queries ({out_of_scope} out of scope), threshold {model.threshold}, margin {model.margin}")
+    for name, turns in (("rules", rules), ("rules + classifier", both)):
+        acc, false_accepts = accuracy(gold, [t.intent for t in turns])
+        print(f"  {name:<20} accuracy {acc:.1%}   out-of-scope answered {false_accepts}/{out_of_scope}")
+
+    misses = [(g, t.intent) for g, r, t in zip(gold, rules, both) if r.intent == "default"]
+    print(f"  of {len(misses)} rule misses the classifier answered {sum(g == p for g, p in misses if p != 'default')} "
+          f"correctly, {sum(g != p for g, p in misses if p != 'default')} wrongly, "
+          f"left {sum(p == 'default' for _, p in misses)} at the default answer")
+
+    ranked = model.ranked(model.scores([app.normalize_message(text) for text in texts]))
+    print(f"\nclassifier alone, by threshold and margin (model: {model.threshold}, {model.margin})")
+    for threshold in THRESHOLDS:
+        for margin in MARGINS:
+            predicted = [label if model.accepts(label, score, lead, threshold, margin) else "default"
+                         for label, score, lead in ranked]
+            acc, false_accepts = accuracy(gold, predicted)
+            covered = sum(p != "default" for p, g in zip(predicted, gold) if g != "default") / (len(gold) - out_of_scope)
+            print(f"  {threshold:.2f} {margin:.2f}  accuracy {acc:.1%}   in-scope answered {covered:.0%}   "
+                  f"out-of-scope answered {false_accepts}/{out_of_scope}")
+
+    false_positives = [(text, g, t.intent) for text, g, t in zip(texts, gold, both)
+                       if t.method == "classifier" and t.intent != g]
+    print(f"\nclassifier false positives: {len(false_positives)}")
+    for text, g, p in false_positives:
+        print(f"  {text!r}: {g} -> {p}")
+
+    confusions = Counter((g, t.intent) for g, t in zip(gold, both) if g != t.intent and (g, t.intent) != ("default", "invalid"))
+    if confusions:
+        print("\nmistakes (expected -> got)")
+        for (g, p), n in confusions.most_common():
+            print(f"  {n:3d}  {g} -> {p}")
+
+    single = []
+    for _ in range(args.rounds):
+        for text in texts:
+            start = time.perf_counter()
+            model.classify([text])
+            single.append(time.perf_counter() - start)
+    rng = random.Random(0)
+    batch = [rng.choice(texts) for _ in range(args.batch)]
+    model.classify(batch)
+    batch_times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        model.classify(batch)
+        batch_times.append(time.perf_counter() - start)
+    per_message = min(batch_times) / len(batch)
+    print(f"\nlatency: one message p50 {percentile(single, 0.5) * 1e6:.0f} us, p99 {percentile(single, 0.99) * 1e6:.0f} us; "
+          f"batch of {len(batch)} {min(batch_times) * 1000:.1f} ms ({per_message * 1e6:.1f} us per message)")
+    sys.exit(1 if false_positives else 0)
+
+
+if __name__ == "__main__":
+    main()
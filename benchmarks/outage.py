@@ -0,0 +1,142 @@
+"""Tail latency of /chatbot through a MongoDB outage, with and without deadlines and the circuit breaker
+
+    python benchmarks/outage.py [--workers 8] [--rate 60] [--phase-s 3] [--outage-latency-ms 3000] [--outage-error-rate 0]
+
+Requests arrive at a fixed --rate into one queue served by --workers threads,
+as in a threaded gunicorn worker, so time spent waiting behind stuck requests
+counts. Each mode runs three phases against the fault-injecting stand-in:
+healthy, outage (every database call slowed to --outage-latency-ms and/or
+failing at --outage-error-rate) and recovered. Modes:
+
+    none      no deadline and a breaker that never opens (the old behaviour)
+    deadline  per-call deadline only
+    breaker   deadline and circuit breaker (the defaults)
+
+Reports p50/p99/max latency from arrival to reply per phase, separately for
+review messages (which read MongoDB) and the rest, with status codes and how
+many replies were flagged stale.
+"""
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+import fixtures
+
+REVIEW_MESSAGES = ["ghee reviews", "sesame oil reviews", "reviews", "coconut oil customer feedback"]
+OTHER_MESSAGES = [
+    "hi", "coconut oil price", "ratings", "delivery", "thengai ennai price", "groundnut oil rating",
+    "compare ghee and coconut oil", "chekku ennai benefits", "show all", "price",
+]
+PHASES = ("healthy", "outage", "recovered")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def arrivals(rate, phase_s):
+    """(offset seconds, phase, kind, message), a review message every third request"""
+    schedule, i = [], 0
+    for p, phase in enumerate(PHASES):
+        for n in range(int(rate * phase_s)):
+            kind = "reviews" if i % 3 == 0 else "other"
+            messages = REVIEW_MESSAGES if kind == "reviews" else OTHER_MESSAGES
+            schedule.append((p * phase_s + n / rate, phase, kind, messages[i % len(messages)]))
+            i += 1
+    return schedule
+
+
+def run(app, faults, outage, args):
+    pending = queue.Queue()
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.app.test_client(use_cookies=False)
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            arrived, phase, kind, message = item
+            r = client.post("/chatbot", json={"message": message})
+            with lock:
+                results.append((phase, kind, time.perf_counter() - arrived, r.status_code, "Warning" in r.headers))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.workers)]
+    for t in threads:
+        t.start()
+    start = time.perf_counter()
+    phase = None
+    for offset, item_phase, kind, message in arrivals(args.rate, args.phase_s):
+        if item_phase != phase:
+            phase = item_phase
+            faults.latency, faults.error_rate = outage if phase == "outage" else (0.0, 0.0)
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pending.put((time.perf_counter(), item_phase, kind, message))
+    for _ in threads:
+        pending.put(None)
+    for t in threads:
+        t.join()
+    faults.latency, faults.error_rate = 0.0, 0.0
+    return results
+
+
+def report(mode, results):
+    print(f"\n{mode}")
+    print(f"  {'phase':<10} {'kind':<8} {'n':>5} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'stale':>6}  statuses")
+    for phase in PHASES:
+        for kind in ("reviews", "other"):
+            rows = [r for r in results if r[0] == phase and r[1] == kind]
+            if not rows:
+                continue
+            latencies = [r[2] * 1000 for r in rows]
+            statuses = ", ".join(f"{code}: {n}" for code, n in sorted(Counter(r[3] for r in rows).items()))
+            stale = sum(r[4] for r in rows)
+            print(f"  {phase:<10} {kind:<8} {len(rows):>5} {percentile(latencies, 0.5):>9.1f} "
+                  f"{percentile(latencies, 0.99):>9.1f} {max(latencies):>9.1f} {stale:>6}  {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=60, help="requests per second")
+    parser.add_argument("--phase-s", type=float, default=3)
+    parser.add_argument("--outage-latency-ms", type=float, default=3000)
+    parser.add_argument("--outage-error-rate", type=float, default=0.0)
+    parser.add_argument("--reset-s", type=float, default=2, help="breaker reset timeout")
+    parser.add_argument("--modes", default="none,deadline,breaker")
+    args = parser.parse_args()
+
+    faults = fixtures.Faults()
+    fixtures.install(faults=faults)
+    os.environ.setdefault("QUERY_LOG", "off")
+    import app
+    app.app.logger.setLevel(logging.ERROR)
+    app.start_data_layer()
+    app.wait_for_data()
+    while app.data_stale():
+        time.sleep(0.05)
+
+    outage = (args.outage_latency_ms / 1000, args.outage_error_rate)
+    breaker = app.mongo_breaker
+    deadline, threshold = breaker.deadline, breaker.failure_threshold
+    print(f"{args.rate:.0f} req/s, {args.workers} workers, {args.phase_s:.0f} s per phase; outage: "
+          f"{args.outage_latency_ms:.0f} ms per call, {args.outage_error_rate:.0%} errors; "
+          f"deadline {deadline * 1000:.0f} ms, breaker opens at {threshold}/{breaker.window} bad calls")
+    for mode in args.modes.split(","):
+        breaker.deadline = None if mode == "none" else deadline
+        breaker.failure_threshold = threshold if mode == "breaker" else 0
+        breaker.reset_timeout = args.reset_s
+        breaker.opened_at = None
+        report(mode, run(app, faults, outage, args))
+
+
+if __name__ == "__main__":
+    main()
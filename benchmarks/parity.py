@@ -0,0 +1,162 @@
+"""Replay check: the corpus answered as the app before the keyword router answered it, except listed deviations
+
+    python benchmarks/parity.py                    # compare this tree with the baseline
+    python benchmarks/parity.py --record OLD_TREE  # re-record the baseline from another checkout
+
+parity_baseline.json holds, for every query in benchmarks/corpus.json, the
+intent, product, status and reply of the app.py the router replaced (the
+baseline commit; ``git worktree add /tmp/base 23da48e`` and record from
+/tmp/base). That app has no intents, so they are read off its reply
+templates (ORIGINAL_REPLIES). parity_allowed.json lists the queries allowed to
+differ: for each, the fields that may differ, the request that changed them
+and why; an entry with "sections" instead of "response" among its fields lets
+only the reply sections (split on <br><br>) opening with those prefixes
+differ. Both apps run against the seeded mongomock stand-in with no session
+cookie and the reply RNG reseeded per query. Exits 1 listing every other
+difference, and every allowed one that no longer happens.
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+
+import fixtures
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, "corpus.json")
+BASELINE_PATH = os.path.join(HERE, "parity_baseline.json")
+ALLOWED_PATH = os.path.join(HERE, "parity_allowed.json")
+FIELDS = ("intent", "product", "status", "response")
+
+# Opening of every reply template of the pre-router app, first match wins
+ORIGINAL_REPLIES = [
+    ("🌿 I specialize", "invalid"), ("🛢️ Need help with oils", "invalid"), ("💡 Example queries", "invalid"),
+    ("We are Isvaryam", "about"), ("Isvaryam specializes", "about"), ("At Isvaryam, we sell", "about"),
+    ("Here are all our product prices", "all_prices"),
+    ("Here are the benefits of all our products", "all_benefits"),
+    ("Good Day!", "greeting"),
+    ("😄 I'm just", "silly"), ("🤖 I'm a chatbot", "silly"), ("😊 While I", "silly"), ("💡 I exist", "silly"),
+    ("📞 Phone", "contact"), ("Here's how to reach us", "contact"), ("Our contact details", "contact"),
+    ("🚚", "delivery"), ("📦 Delivery", "delivery"), ("⏱️", "delivery"),
+    ("📦 We offer", "product_list"), ("🛍️", "product_list"), ("🛒 Available products", "product_list"),
+    ("🌟 Benefits of", "product"), ("No reviews yet for", "product"), ("<b>Reviews for", "product"),
+    ("⭐ Average rating for", "product"), ("⚠️ No ratings available for", "product"),
+    ("Sorry, I couldn't find information", "product"), ("🛒", "product"), ("🧾", "product"), ("📸", "product"),
+    ("📝", "product"),
+    ("No reviews available yet", "all_reviews"), ("<b>", "all_reviews"),
+    ("⭐", "all_ratings"),
+    ("🤖 I didn't catch", "default"), ("❓ Not sure", "default"), ("💡 Need help?", "default"),
+    ("⚠️ Sorry, something went wrong", "error"),
+]
+
+
+def reply_intent(response):
+    for opening, intent in ORIGINAL_REPLIES:
+        if (response or "").startswith(opening):
+            return intent
+    return None
+
+
+def without_sections(response, openings):
+    return [s for s in (response or "").split("<br><br>") if not s.startswith(tuple(openings))]
+
+
+def load_app(tree=None):
+    """The app module of tree (this checkout by default) with its data loaded synchronously"""
+    tree = os.path.abspath(tree or fixtures.ROOT)
+    os.chdir(tree)  # app.py opens its JSON data files relative to the working directory
+    sys.path.insert(0, tree)
+    app = importlib.import_module("app")
+    for name in ("catalog", "review_summaries", "review_search", "recommendations"):
+        state = getattr(app, name, None)
+        if hasattr(state, "refresh"):
+            state.refresh()
+    return app
+
+
+def replay(app, corpus, route=None):
+    """One answer per corpus query; route(app, query) gives its (intent, product), else the intent is read off the reply"""
+    client = app.app.test_client(use_cookies=False)
+    answers = []
+    for category, queries in corpus.items():
+        for query in queries:
+            random.seed(0)
+            r = client.post("/chatbot", json={"message": query})
+            response = (r.get_json() or {}).get("response")
+            intent, product = route(app, query) if route else (reply_intent(response), None)
+            answers.append({"category": category, "query": query, "intent": intent,
+                            "product": product if intent == "product" else None,
+                            "status": r.status_code, "response": response})
+    return answers
+
+
+def current_route(app, query):
+    turn = app.resolve(query, app.catalog.snapshot())
+    return turn.intent, list(turn.product) if isinstance(turn.product, tuple) else turn.product
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", metavar="OLD_TREE", help="record the baseline from the app.py in this checkout")
+    args = parser.parse_args()
+
+    os.environ["QUERY_LOG"] = "off"
+    os.environ["SNAPSHOT_DIR"] = ""
+    fixtures.install()
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    if args.record:
+        app = load_app(args.record)
+        answers = replay(app, corpus)
+        for answer in answers:
+            if answer["intent"] == "product":
+                answer["product"] = app.extract_product_name(answer["query"].lower().strip())
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(answers, f, indent=1, ensure_ascii=False)
+            f.write("\n")
+        print(f"recorded {len(answers)} answers from {os.path.join(args.record, 'app.py')} in {BASELINE_PATH}")
+        return
+
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = {(a["category"], a["query"]): a for a in json.load(f)}
+    with open(ALLOWED_PATH, encoding="utf-8") as f:
+        allowed = json.load(f)
+    answers = replay(load_app(), corpus, current_route)
+
+    unexpected = unused = 0
+    deviating = set()
+    for answer in answers:
+        before = baseline.get((answer["category"], answer["query"]))
+        if before is None:
+            unexpected += 1
+            print(f"{answer['category']}: {answer['query']!r} is not in the baseline; re-record it")
+            continue
+        changed = [field for field in FIELDS if before[field] != answer[field]]
+        if changed:
+            deviating.add(answer["query"])
+        entry = allowed.get(answer["query"], {})
+        permitted = list(entry.get("fields", []))
+        if "response" in changed and entry.get("sections") and (
+                without_sections(before["response"], entry["sections"])
+                == without_sections(answer["response"], entry["sections"])):
+            permitted.append("response")
+        extra = [field for field in changed if field not in permitted]
+        if not extra:
+            continue
+        unexpected += 1
+        print(f"{answer['category']}: {answer['query']!r}")
+        for field in extra:
+            print(f"    {field}: {before[field]!r}\n    {' ' * len(field)}  -> {answer[field]!r}")
+    for query in sorted(set(allowed) - deviating):
+        unused += 1
+        print(f"allowed deviation no longer happens, drop it: {query!r}")
+    print(f"{len(answers)} queries, {len(deviating)} deviate from the baseline app, "
+          f"{unexpected} unexpectedly, {unused} allowed ones unused")
+    sys.exit(1 if unexpected or unused else 0)
+
+
+if __name__ == "__main__":
+    main()
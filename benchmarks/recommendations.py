@@ -0,0 +1,78 @@
+"""Co-occurrence recommendations: rebuild time, lookup and live-update cost, and the lists they produce
+
+    python benchmarks/recommendations.py [--reviews-per-product 2000] [--users 5000] [--sessions 20000]
+
+Seeds the mongomock stand-in with reviews from --users customers and a query
+log of --sessions chat sessions in which shoppers of one product tend to ask
+about its "partner" too (coconut oil with sesame oil, ghee with jaggery
+powder), then rebuilds the lists and prints them next to the lexicon's static
+ones. mongomock runs the aggregations in Python, so rebuild times are an upper
+bound for a real server.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+import fixtures
+
+PARTNERS = {"coconut oil": "sesame oil", "sesame oil": "coconut oil", "ghee": "jaggery powder",
+            "jaggery powder": "ghee", "groundnut oil": "super pack", "super pack": "groundnut oil"}
+
+
+def query_log(count, rng):
+    products = sorted(PARTNERS)
+    now = datetime.now(timezone.utc)
+    for s in range(count):
+        first = rng.choice(products)
+        asked = [first, PARTNERS[first] if rng.random() < 0.6 else rng.choice(products)]
+        for product in asked[:rng.randint(1, 2)]:
+            yield {"at": now, "endpoint": "chatbot", "session": f"session{s}", "product": product, "intent": "product"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews-per-product", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--sessions", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("QUERY_LOG", "off")
+    raw = fixtures.install(reviews_per_product=args.reviews_per_product, users=args.users)
+    db = raw["isvaryam"]
+    db.query_log.insert_many(list(query_log(args.sessions, random.Random(0))))
+    import app
+    from recommendations import Recommendations
+
+    recommendations = Recommendations(db.reviews, db.products, db.query_log)
+    start = time.perf_counter()
+    recommendations.refresh()
+    rebuilt = time.perf_counter() - start
+    print(f"{db.reviews.count_documents({})} reviews, {db.query_log.count_documents({})} query log records: "
+          f"rebuilt in {rebuilt * 1000:.0f} ms")
+
+    print(f"\n{'product':<16} {'co-occurrence':<52} static")
+    for name in sorted(PARTNERS):
+        static = app.lexicon.current.recommendations.get(name, [])
+        print(f"{name:<16} {', '.join(recommendations.get(name)):<52} {', '.join(static)}")
+
+    n = 200000
+    start = time.perf_counter()
+    for _ in range(n):
+        recommendations.get("ghee", ())
+    lookup = (time.perf_counter() - start) / n
+
+    rng = random.Random(1)
+    products = sorted(PARTNERS)
+    turns = [(f"live{rng.randrange(2000)}", [rng.choice(products)]) for _ in range(20000)]
+    start = time.perf_counter()
+    for session, asked in turns:
+        recommendations.observe(session, asked)
+    observe = (time.perf_counter() - start) / len(turns)
+    print(f"\nget(): {lookup * 1e9:.0f} ns   observe(): {observe * 1e6:.1f} us per turn   "
+          f"version changes while observing: {recommendations.version - 1}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Replayable /chatbot load test and micro-benchmarks of the matching helpers
+
+    python benchmarks/routing.py [--rounds 20] [--latency-ms 0] [--output routing.json] [--compare old.json]
+
+Replays benchmarks/corpus.json (English, Tanglish, typos, offensive, unrelated
+and catalog-wide queries) through the Flask test client against the seeded
+mongomock stand-in, after one warm-up round. Reports throughput and
+p50/p95/p99 latency per corpus category and per intent branch, then times
+the helpers behind routing one call at a time. Everything is written to
+--output as JSON; --compare prints the p50/p95 change against an earlier file.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+
+import fixtures
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus.json")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def summarize(latencies):
+    """Latency stats in microseconds for a list of per-call durations in seconds"""
+    total = sum(latencies)
+    return {
+        "calls": len(latencies),
+        "per_s": round(len(latencies) / total, 1) if total else None,
+        "mean_us": round(total / len(latencies) * 1e6, 1),
+        "p50_us": round(percentile(latencies, 0.50) * 1e6, 1),
+        "p95_us": round(percentile(latencies, 0.95) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 0.99) * 1e6, 1),
+    }
+
+
+def branch(turn):
+    """Intent branch of answer() a turn takes; product turns split by the block they ask for"""
+    if turn.intent != "product":
+        return turn.intent
+    for block in ("benefit_question", "reviews", "rating"):
+        if turn.matches.has(block):
+            return f"product:{block}"
+    return "product:info"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=fixtures.ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_test(app, corpus, rounds):
+    client = app.app.test_client()
+    snapshot = app.catalog.snapshot()
+    queries = [(category, q, branch(app.resolve(q, snapshot)))
+               for category, items in corpus.items() for q in items]
+    for _, q, _ in queries:
+        client.post("/chatbot", json={"message": q})
+
+    by_category, by_branch, overall = {}, {}, []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for category, q, name in queries:
+            t = time.perf_counter()
+            r = client.post("/chatbot", json={"message": q})
+            elapsed = time.perf_counter() - t
+            assert r.status_code == 200, (q, r.status_code)
+            overall.append(elapsed)
+            by_category.setdefault(category, []).append(elapsed)
+            by_branch.setdefault(name, []).append(elapsed)
+    wall = time.perf_counter() - start
+
+    return {
+        "overall": {**summarize(overall), "per_s": round(len(overall) / wall, 1)},
+        "categories": {k: summarize(v) for k, v in by_category.items()},
+        "intents": {k: summarize(v) for k, v in sorted(by_branch.items())},
+    }
+
+
+def micro(app, corpus, rounds):
+    snapshot = app.catalog.snapshot()
+    queries = [app.normalize_message(q) for items in corpus.values() for q in items]
+    helpers = {
+        "normalize_message": app.normalize_message,
+        "scan_input": app.scan_input,
+        "is_invalid_query": app.is_invalid_query,
+        "translate_tanglish_to_english": app.translate_tanglish_to_english,
+        "extract_product_name": lambda q: app.extract_product_name(q, snapshot),
+        "route": lambda q: app.route(q, snapshot),
+        "route_message": lambda q: app.route_message(q, snapshot),
+        "resolve": lambda q: app.resolve(q, snapshot),  # memo hits after the first round
+    }
+    results = {}
+    for name, fn in helpers.items():
+        latencies = []
+        for _ in range(rounds):
+            for q in queries:
+                t = time.perf_counter()
+                fn(q)
+                latencies.append(time.perf_counter() - t)
+        results[name] = summarize(latencies)
+    return results
+
+
+def print_section(title, rows):
+    print(f"\n{title:<32} {'calls':>7} {'per s':>9} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}")
+    for name, s in rows.items():
+        print(f"{name:<32} {s['calls']:>7} {s['per_s'] or 0:>9.0f} {s['p50_us']:>9.1f} {s['p95_us']:>9.1f} {s['p99_us']:>9.1f}")
+
+
+def compare(old, new):
+    print(f"\n{'change vs ' + str(old['meta'].get('commit')):<40} {'p50':>16} {'p95':>16}")
+    for section in ("categories", "intents", "helpers"):
+        for name, s in new[section].items():
+            before = old.get(section, {}).get(name)
+            if not before:
+                continue
+            cells = [f"{(s[k] - before[k]) / before[k] * 100:+6.1f}% ({s[k]:.0f})" for k in ("p50_us", "p95_us")]
+            print(f"{section[:-1] + ' ' + name:<40} {cells[0]:>16} {cells[1]:>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", default="routing.json")
+    parser.add_argument("--compare", help="earlier --output file to diff against")
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+    fixtures.install(latency=args.latency_ms / 1000)
+    import app
+    app.wait_for_data()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "rounds": args.rounds,
+            "latency_ms": args.latency_ms,
+            "queries": sum(len(v) for v in corpus.values()),
+        },
+        **load_test(app, corpus, args.rounds),
+        "helpers": micro(app, corpus, args.rounds),
+    }
+    o = results["overall"]
+    print(f"/chatbot: {o['per_s']:.0f} req/s  p50 {o['p50_us']:.0f} us  p95 {o['p95_us']:.0f} us  p99 {o['p99_us']:.0f} us")
+    print_section("category", results["categories"])
+    print_section("intent branch", results["intents"])
+    print_section("helper", results["helpers"])
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nwrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
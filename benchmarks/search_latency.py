@@ -0,0 +1,113 @@
+"""Review keyword search: index build time and query latency against a full scan
+
+    python benchmarks/search_latency.py [--reviews 50000] [--queries 500]
+
+Synthetic reviews are stitched from customer-style phrases (English and
+Tanglish). The index is warmed as ReviewSearch warms a rebuilt one. Each query
+runs through ReviewIndex, then again with a new review added before it (as the
+change stream adds them), and through a pure-Python BM25 scan of every review;
+the top results of the index and the scan are compared.
+"""
+import argparse
+import math
+import random
+import time
+from collections import Counter
+
+import fixtures
+from review_search import B, K1, ReviewIndex, Tokenizer
+
+PHRASES = [
+    "smells fresh and natural", "good packaging", "no leaks at all", "taste is like homemade", "bit costly",
+    "worth the price", "delivery was late", "bottle was damaged", "packaging could be better", "very aromatic",
+    "my family loves it", "thick and pure", "not happy with the smell", "best chekku ennai", "thengai ennai is pure",
+    "nei smells like home", "will order again", "leaked during delivery", "cap was loose", "colour is golden",
+    "used it for cooking", "good for hair", "skin feels soft", "kids like the taste", "karupatti tastes earthy",
+    "price went up", "fast delivery", "customer support was helpful", "slightly bitter", "perfect for deepam",
+]
+
+QUERIES = ["smell", "packaging", "delivery late", "leak", "taste", "price", "thengai ennai", "hair", "bitter",
+           "damaged bottle", "aromatic smell", "cooking", "nei", "support", "colour"]
+
+
+def reviews(count, rng, products, first=0):
+    for i in range(first, first + count):
+        yield {
+            "_id": i,
+            "productId": rng.choice(products),
+            "review": ", ".join(rng.sample(PHRASES, rng.randint(1, 4))).capitalize(),
+            "rating": rng.randint(1, 5),
+        }
+
+
+def scan(index, query, product_id, limit):
+    """BM25 by visiting every review, as a search without an index would"""
+    terms = list(dict.fromkeys(index.tokenize(query)))
+    docs = [Counter(index.tokenize(d["review"])) for d in index.docs]
+    n = len(docs)
+    avgdl = sum(sum(d.values()) for d in docs) / n
+    df = {t: sum(1 for d in docs if t in d) for t in terms}
+    scored = []
+    for i, (doc, tf) in enumerate(zip(index.docs, docs)):
+        if product_id is not None and doc["productId"] != product_id:
+            continue
+        dl = sum(tf.values())
+        score = sum(
+            math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) * tf[t] * (K1 + 1) / (tf[t] + K1 * (1 - B + B * dl / avgdl))
+            for t in terms if tf[t]
+        )
+        if score > 0:
+            scored.append((-score, -i))
+    return [-i for _, i in sorted(scored)[:limit]]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return "  ".join(f"p{p} {latencies[int(len(latencies) * p / 100)] * 1e6:.0f} us" for p in (50, 95, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--checks", type=int, default=10, help="queries also answered by the full scan")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    products = [p.lower() for p in fixtures.PRODUCTS]
+    index = ReviewIndex(Tokenizer({"thengai ennai": "coconut oil", "nei": "ghee", "karupatti": "jaggery powder"}))
+    start = time.perf_counter()
+    for review in reviews(args.reviews, rng, products):
+        index.add(review)
+    index.warm()
+    build = time.perf_counter() - start
+
+    queries = [(rng.choice(QUERIES), rng.choice([None, *products])) for _ in range(args.queries)]
+    latencies = []
+    for query, product in queries:
+        t = time.perf_counter()
+        index.search(query, product_id=product)
+        latencies.append(time.perf_counter() - t)
+
+    inserted = []
+    for (query, product), review in zip(queries, reviews(len(queries), rng, products, args.reviews)):
+        index.add(review)
+        t = time.perf_counter()
+        index.search(query, product_id=product)
+        inserted.append(time.perf_counter() - t)
+
+    mismatches, scan_time = 0, 0.0
+    for query, product in queries[:args.checks]:
+        t = time.perf_counter()
+        expected = scan(index, query, product, 5)
+        scan_time += time.perf_counter() - t
+        mismatches += [d["_id"] for d in index.search(query, product_id=product)] != expected
+
+    print(f"reviews:          {args.reviews}  (index built in {build:.2f} s, {len(index._postings)} terms)")
+    print(f"indexed search:   {percentiles(latencies)}")
+    print(f"after each add:   {percentiles(inserted)}")
+    print(f"full scan:        {scan_time / max(args.checks, 1) * 1e3:.0f} ms per query   mismatches: {mismatches}/{args.checks}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Worker startup: time to import, to first answer and to /ready, with and without a snapshot
+
+    python benchmarks/startup.py [--latency-ms 500] [--runs 3]
+
+Each run is a fresh interpreter against the seeded mongomock stand-in with
+--latency-ms on every database call, standing in for a slow or distant Mongo.
+"cold" starts with an empty SNAPSHOT_DIR; "warm" reuses the snapshot the cold
+run left behind, like a restarted worker.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import fixtures
+
+
+def child(latency):
+    fixtures.install(latency=latency)
+    start = time.perf_counter()
+    import app
+    imported = time.perf_counter()
+    client = app.app.test_client()
+    reply = client.post("/chatbot", json={"message": "coconut oil price"}).get_json()
+    answered = time.perf_counter()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.005)
+    ready = time.perf_counter()
+    print(json.dumps({
+        "import": imported - start,
+        "first_answer": answered - start,
+        "ready": ready - start,
+        "answered_from": "price" if "₹" in reply["response"] else "no data",
+    }))
+
+
+def run(latency, snapshot_dir):
+    env = dict(os.environ, SNAPSHOT_DIR=snapshot_dir)
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", "--latency-ms", str(latency * 1000)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+    if args.child:
+        return child(latency)
+
+    print(f"{'start':<6} {'import ms':>10} {'first answer ms':>16} {'ready ms':>9}  answer")
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            for label in ("cold", "warm"):
+                r = run(latency, snapshot_dir)
+                print(f"{label:<6} {r['import'] * 1e3:>10.0f} {r['first_answer'] * 1e3:>16.0f} {r['ready'] * 1e3:>9.0f}  {r['answered_from']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Per-call deadlines and a circuit breaker for MongoDB reads on the request path"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MONGO_DEADLINE = float(os.environ.get("MONGO_DEADLINE_MS", "1000")) / 1000
+MONGO_SLOW_CALL = float(os.environ.get("MONGO_SLOW_CALL_MS", "300")) / 1000
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5"))
+BREAKER_WINDOW = int(os.environ.get("BREAKER_WINDOW", "20"))
+BREAKER_RESET = float(os.environ.get("BREAKER_RESET", "10"))
+
+
+class CircuitOpenError(PyMongoError):
+    """Raised instead of calling MongoDB while the breaker is open"""
+
+
+class CircuitBreaker:
+    """Fails MongoDB calls fast after repeated failures or slow calls
+
+    Closed: every call runs under ``deadline`` seconds (``pymongo.timeout``);
+    failures and calls slower than ``slow_call`` are bad outcomes. Once
+    ``failure_threshold`` of the last ``window`` outcomes are bad the breaker
+    opens and calls raise CircuitOpenError without touching the database. After
+    ``reset_timeout`` seconds one call is let through as a probe: success
+    closes the breaker, a bad outcome opens it again. A failure_threshold of 0
+    never opens it.
+
+    A block that awaits its call also times the event loop's queueing, not just
+    the database, so async callers guard with ``timed=False``: only failures
+    (including the client's own timeoutMS) count against the breaker.
+    """
+
+    def __init__(self, name, deadline=MONGO_DEADLINE, slow_call=MONGO_SLOW_CALL, failure_threshold=BREAKER_FAILURES,
+                 window=BREAKER_WINDOW, reset_timeout=BREAKER_RESET):
+        self.name = name
+        self.deadline = deadline
+        self.slow_call = slow_call
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.opened_at = None
+        self._outcomes = deque(maxlen=window)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.reset_timeout else "half_open"
+
+    def status(self):
+        return {"state": self.state, "bad": sum(self._outcomes), "calls": len(self._outcomes)}
+
+    @contextmanager
+    def guard(self, timed=True):
+        """Run the block as one MongoDB call; raises CircuitOpenError while open"""
+        probe = self._admit()
+        started = time.monotonic()
+        failed = False
+        try:
+            with pymongo.timeout(self.deadline):
+                yield
+        except PyMongoError:
+            failed = True
+            raise
+        finally:
+            slow = timed and time.monotonic() - started > self.slow_call
+            self._record(failed or slow, probe)
+
+    def call(self, fn, *args, **kwargs):
+        with self.guard():
+            return fn(*args, **kwargs)
+
+    def _admit(self):
+        """True if this call is the half-open probe"""
+        state = self.state
+        if state == "closed":
+            return False
+        with self._lock:
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+        metrics.MONGO_BREAKER_EVENTS.labels(self.name, "rejected").inc()
+        raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+    def _record(self, bad, probe):
+        with self._lock:
+            if probe:
+                self._probing = False
+                if bad:
+                    self._open()
+                else:
+                    self.opened_at = None
+                    self._outcomes.clear()
+                    logger.warning("%s circuit breaker closed", self.name)
+                    metrics.MONGO_BREAKER_EVENTS.labels(self.name, "closed").inc()
+                return
+            if self.opened_at is not None:
+                return  # admitted before another call opened the breaker
+            self._outcomes.append(bad)
+            if self.failure_threshold and sum(self._outcomes) >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        logger.warning("%s circuit breaker opened for %.0f s", self.name, self.reset_timeout)
+        self.opened_at = time.monotonic()
+        self._outcomes.clear()
+        metrics.MONGO_BREAKER_EVENTS.labels(self.name, "opened").inc()
@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from live_state import LiveState
+
+CATALOG_TTL = float(os.environ.get("CATALOG_TTL", "300"))
+
+
+class CatalogSnapshot:
+    """Immutable, name-keyed view of the products collection"""
+
+    def __init__(self, docs, version):
+        self.version = version
+        self.loaded_at = time.time()
+        self.products = tuple(docs)
+        self.by_name = MappingProxyType({p["name"].lower(): p for p in self.products})
+        self.product_map = MappingProxyType({str(p["_id"]): p["name"] for p in self.products})
+        self.product_name_to_id = MappingProxyType({p["name"].lower(): str(p["_id"]) for p in self.products})
+
+    def find(self, name):
+        """Case-insensitive lookup by (partial) product name, same result as the old $regex find_one"""
+        name = name.lower()
+        item = self.by_name.get(name)
+        if item is not None:
+            return item
+        for p in self.products:
+            if name in p["name"].lower():
+                return p
+        return None
+
+
+class Catalog(LiveState):
+    """Holds the current CatalogSnapshot and swaps in a new one when products change
+
+    A background thread follows the collection's change stream and falls back to
+    polling every CATALOG_TTL seconds when change streams are unavailable
+    (standalone servers, mocks). Readers grab ``snapshot()`` once per request and
+    never touch the database.
+    """
+
+    name = "catalog"
+
+    def __init__(self, collection, ttl=CATALOG_TTL, snapshot_path=None):
+        self._snapshot = CatalogSnapshot((), 0)
+        self._refresh_lock = threading.Lock()
+        super().__init__(collection, ttl, snapshot_path)
+
+    def snapshot(self):
+        return self._snapshot
+
+    def _refresh(self):
+        with self._refresh_lock:
+            self._swap(list(self.collection.find()))
+
+    def dump(self):
+        return {"products": list(self._snapshot.products)}
+
+    def restore(self, data):
+        self._swap(data["products"])
+
+    def _swap(self, docs):
+        # Keep the version, and with it everything cached per snapshot, when a poll finds no change
+        if tuple(docs) == self._snapshot.products:
+            return
+        # Single reference assignment: readers see either the old or the new snapshot
+        self._snapshot = CatalogSnapshot(docs, self._snapshot.version + 1)
+
+    def status(self):
+        return {**super().status(), "version": self._snapshot.version, "products": len(self._snapshot.products)}
@@ -0,0 +1,221 @@
+"""Fallback intent classifier for messages the keyword rules do not resolve
+
+Messages and the labelled example queries of every intent (intent_examples.json)
+are hashed character n-gram TF-IDF vectors. A message scores, per intent, its
+cosine similarity to the closest example of that intent, so scoring a batch of
+messages is one matrix multiply against the example matrix. The examples
+labelled "out_of_scope" are messages the bot has no answer for; a message
+closest to them, or about as close to two intents, keeps the default answer
+rather than a confident wrong one. The fitted model
+is saved to a small .npz artifact that loads in a few milliseconds; rebuild
+and commit it after editing the examples:
+
+    python classifier.py [intent_examples.json] [intent_model.npz]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import zlib
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INTENT_EXAMPLES_PATH = os.environ.get("INTENT_EXAMPLES_PATH", "intent_examples.json")
+INTENT_MODEL_PATH = os.environ.get("INTENT_MODEL_PATH", "intent_model.npz")
+# Lowest cosine similarity accepted; below it the message gets the default answer
+INTENT_THRESHOLD = float(os.environ.get("INTENT_THRESHOLD", "0.45"))
+# Least lead of the best intent over the runner-up accepted
+INTENT_MARGIN = float(os.environ.get("INTENT_MARGIN", "0.05"))
+# Label of the negative examples; never an answer
+OUT_OF_SCOPE = "out_of_scope"
+
+FEATURES = 2 ** 12
+NGRAM_SIZES = (2, 3, 4)
+# Dropped before hashing: on their own they would match any example that happens to contain them
+FILLER_WORDS = {"a", "an", "the", "is", "are", "am", "of", "in", "on", "to", "for", "please", "pls", "plz", "sir", "madam"}
+# Messages scored per matrix multiply, bounding its intermediates
+CHUNK = 256
+
+
+@functools.lru_cache(maxsize=16384)
+def word_columns(word):
+    """Hashed columns of the character n-grams of one word padded with spaces, so word starts and ends count
+
+    crc32 keeps columns stable across processes; words repeat, so they are memoized.
+    """
+    padded = f" {word} "
+    return tuple(zlib.crc32(padded[i:i + n].encode()) % FEATURES
+                 for n in NGRAM_SIZES for i in range(len(padded) - n + 1))
+
+
+def hashed_counts(text):
+    """{column: count} of the n-grams of text's non-filler words"""
+    counts = Counter()
+    for word in text.split():
+        if word not in FILLER_WORDS:
+            counts.update(word_columns(word))
+    return counts
+
+
+def vectorize(texts, idf):
+    """L2-normalized TF-IDF rows in sparse form: (row starts, columns, weights)
+
+    A message sets a few dozen of the FEATURES columns; one without any n-grams
+    gets a single zero weight, so it scores 0 everywhere.
+    """
+    starts, columns, counts = [], [], []
+    for text in texts:
+        c = hashed_counts(text) or {0: 0}
+        starts.append(len(columns))
+        columns.extend(c)
+        counts.extend(c.values())
+    starts = np.array(starts)
+    columns = np.array(columns)
+    counts = np.array(counts, dtype=np.float32)
+    # Sublinear term frequency, so a repeated n-gram does not dominate
+    weights = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0) * idf[columns]
+    norms = np.sqrt(np.add.reduceat(weights ** 2, starts))
+    weights /= np.repeat(np.maximum(norms, 1e-12), np.diff(np.append(starts, len(columns))))
+    return starts, columns, weights
+
+
+def examples_digest(path):
+    """Fingerprint of the examples file and the feature settings a model was built with"""
+    digest = hashlib.sha256(repr((FEATURES, NGRAM_SIZES, sorted(FILLER_WORDS))).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+class IntentClassifier:
+    """Nearest labelled example by cosine similarity, with a confidence threshold and margin
+
+    ``vectors`` are the example vectors in vectorize() form, grouped by intent;
+    ``offsets[i]`` is the first example of ``labels[i]``.
+    """
+
+    def __init__(self, labels, offsets, idf, vectors, digest=None, threshold=INTENT_THRESHOLD, margin=INTENT_MARGIN):
+        self.labels = list(labels)
+        self.offsets = offsets
+        self.idf = idf
+        self.vectors = vectors
+        self.digest = digest
+        self.threshold = threshold
+        self.margin = margin
+        # Dense (FEATURES, examples) matrix: the example weights of one feature are one contiguous row
+        starts, columns, weights = vectors
+        rows = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(columns))))
+        self._by_feature = np.zeros((FEATURES, len(starts)), dtype=np.float32)
+        self._by_feature[columns, rows] = weights
+
+    @classmethod
+    def fit(cls, examples, digest=None, threshold=INTENT_THRESHOLD, margin=INTENT_MARGIN):
+        """Fit from {intent: [example query, ...]}"""
+        labels = [label for label, texts in examples.items() if texts]
+        offsets = np.cumsum([0] + [len(examples[label]) for label in labels[:-1]])
+        texts = [text for label in labels for text in examples[label]]
+
+        df = np.zeros(FEATURES, dtype=np.float64)
+        for text in texts:
+            df[list(hashed_counts(text))] += 1
+        idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return cls(labels, offsets, idf, vectorize(texts, idf), digest, threshold, margin)
+
+    @classmethod
+    def from_examples(cls, path, threshold=INTENT_THRESHOLD, margin=INTENT_MARGIN):
+        with open(path, encoding="utf-8") as f:
+            examples = json.load(f)
+        return cls.fit(examples, digest=examples_digest(path), threshold=threshold, margin=margin)
+
+    @classmethod
+    def load(cls, path, threshold=INTENT_THRESHOLD, margin=INTENT_MARGIN):
+        with np.load(path, allow_pickle=False) as data:
+            vectors = (data["starts"], data["columns"], data["weights"])
+            return cls(data["labels"].tolist(), data["offsets"], data["idf"], vectors, str(data["digest"]),
+                       threshold, margin)
+
+    def save(self, path):
+        starts, columns, weights = self.vectors
+        with open(path, "wb") as f:
+            np.savez(f, labels=np.array(self.labels), offsets=self.offsets, idf=self.idf, starts=starts,
+                     columns=columns.astype(np.int32), weights=weights, digest=np.array(self.digest or ""))
+
+    def scores(self, texts):
+        """(len(texts), len(labels)) similarity of every message to the closest example of every intent
+
+        A batch only touches the few hundred feature columns its messages use, so
+        it is packed into a dense (messages, used columns) matrix and scored with
+        one matrix multiply against those rows of the example matrix.
+        """
+        out = np.empty((len(texts), len(self.labels)), dtype=np.float32)
+        for start in range(0, len(texts), CHUNK):
+            starts, columns, weights = vectorize(texts[start:start + CHUNK], self.idf)
+            used, packed = np.unique(columns, return_inverse=True)
+            rows = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(columns))))
+            queries = np.zeros((len(starts), len(used)), dtype=np.float32)
+            queries[rows, packed] = weights
+            similarity = queries @ self._by_feature[used]
+            out[start:start + CHUNK] = np.maximum.reduceat(similarity, self.offsets, axis=1)
+        return out
+
+    def classify(self, texts):
+        """[(intent or None, score), ...]
+
+        None when the best score is under the threshold, leads the runner-up by
+        less than the margin, or is an out-of-scope example's.
+        """
+        if not texts:
+            return []
+        return [(label if self.accepts(label, score, lead) else None, score)
+                for label, score, lead in self.ranked(self.scores(texts))]
+
+    def ranked(self, scores):
+        """[(best label, its score, its lead over the runner-up), ...] for the rows of scores()"""
+        best = scores.argmax(axis=1)
+        first, second = -np.partition(-scores, 1, axis=1)[:, :2].T
+        return [(self.labels[i], float(a), float(a - b)) for i, a, b in zip(best, first, second)]
+
+    def accepts(self, label, score, lead, threshold=None, margin=None):
+        """True if the best label is an answer, under this model's threshold and margin unless given others"""
+        threshold = self.threshold if threshold is None else threshold
+        margin = self.margin if margin is None else margin
+        return label != OUT_OF_SCOPE and score >= threshold and lead >= margin
+
+
+def load_classifier(model_path=INTENT_MODEL_PATH, examples_path=INTENT_EXAMPLES_PATH, threshold=INTENT_THRESHOLD,
+                    margin=INTENT_MARGIN):
+    """The saved model, refitted from the examples if it is missing or out of date; None if neither loads"""
+    try:
+        digest = examples_digest(examples_path)
+    except OSError:
+        digest = None
+    try:
+        model = IntentClassifier.load(model_path, threshold, margin)
+        if digest is None or model.digest == digest:
+            return model
+        logger.warning("%s was built from another %s or feature settings; refitting in memory", model_path, examples_path)
+    except (OSError, KeyError, ValueError) as e:
+        if digest is None:
+            logger.warning("No intent classifier: %s", e)
+            return None
+        logger.warning("Could not load %s (%s); fitting from %s", model_path, e, examples_path)
+    return IntentClassifier.from_examples(examples_path, threshold, margin)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the intent classifier artifact from labelled examples")
+    parser.add_argument("examples", nargs="?", default=INTENT_EXAMPLES_PATH)
+    parser.add_argument("model", nargs="?", default=INTENT_MODEL_PATH)
+    args = parser.parse_args()
+    model = IntentClassifier.from_examples(args.examples)
+    model.save(args.model)
+    print(f"{args.model}: {len(model.labels)} intents, {len(model.vectors[0])} examples, {FEATURES} features")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import threading
+
+from pymongo import MongoClient
+
+
+class MongoConnection:
+    """MongoClient opened on first use in each process
+
+    PyMongo clients are not fork-safe, so nothing connects at import: a worker
+    forked from a process that already had a client opens its own.
+    """
+
+    def __init__(self, uri, db_name, **client_options):
+        self.uri = uri
+        self.db_name = db_name
+        self.client_options = client_options
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._client = MongoClient(self.uri, **self.client_options)
+                    self._pid = os.getpid()
+        return self._client
+
+    def collection(self, name):
+        return LazyCollection(self, name)
+
+
+class LazyCollection:
+    """Stands in for a pymongo Collection; resolves it on the current process's client per call"""
+
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self.connection.client()[self.connection.db_name][self.name], attr)
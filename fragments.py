@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+import json
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+ENCODINGS = ["br", "gzip", "identity"] if brotli else ["gzip", "identity"]
+
+
+class Fragment:
+    """A rendered answer, its /chatbot JSON body, ETag and pre-compressed variants"""
+
+    __slots__ = ("html", "etag", "bodies")
+
+    def __init__(self, html):
+        # Same bytes Flask's jsonify(response=html) produces
+        body = (json.dumps({"response": html}, separators=(",", ":")) + "\n").encode()
+        self.html = html
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, mtime=0)}
+        if brotli:
+            self.bodies["br"] = brotli.compress(body)
+
+
+def negotiate(fragment, if_none_match, accept_encodings):
+    """Status, body and headers serving a fragment, given parsed If-None-Match and Accept-Encoding"""
+    headers = {"ETag": f'W/"{fragment.etag}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if if_none_match.contains_weak(fragment.etag):
+        return 304, b"", headers
+    encoding = accept_encodings.best_match(ENCODINGS) or "identity"
+    headers["Content-Type"] = "application/json"
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return 200, fragment.bodies[encoding], headers
+
+
+class FragmentCache:
+    """Rendered answers keyed by (intent, product, ...) for the current data version
+
+    ``version`` is whatever identifies the data the fragments were rendered from
+    (catalog and review versions); the first lookup under a new version drops
+    everything rendered before it.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._version = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version, render):
+        """Return the Fragment for key, calling render() for its HTML on a miss"""
+        fragment = self._entries.get((version, key))
+        if fragment is not None:
+            return fragment
+        fragment = Fragment(render())
+        with self._lock:
+            if version != self._version or len(self._entries) >= self.max_entries:
+                self._entries = {}
+                self._version = version
+            self._entries[(version, key)] = fragment
+        return fragment
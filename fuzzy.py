@@ -0,0 +1,88 @@
+from collections import Counter
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# Fewer candidates than this go straight to SequenceMatcher
+LCS_MIN_ROWS = 4
+
+
+class FuzzyIndex:
+    """Spelling-tolerant lookup over a fixed list of names
+
+    ``best(query, cutoff)`` returns the same name as
+    ``difflib.get_close_matches(query, names, n=1, cutoff=cutoff)``. Every name's
+    character counts are stored in one matrix, so difflib's quick_ratio upper
+    bound is computed for all names at once. The names still above the cutoff
+    get a tighter bound from the length of their longest common subsequence
+    with the query (SequenceMatcher's matching blocks are one such
+    subsequence), computed bit-parallel for all of them together, and
+    SequenceMatcher only runs on the few that can still reach the cutoff.
+    """
+
+    def __init__(self, names):
+        self.names = list(dict.fromkeys(names))
+        alphabet = sorted({ch for name in self.names for ch in name})
+        self._columns = {ch: i for i, ch in enumerate(alphabet)}
+        self._counts = np.zeros((len(self.names), len(alphabet)), dtype=np.int32)
+        for row, name in enumerate(self.names):
+            for ch, n in Counter(name).items():
+                self._counts[row, self._columns[ch]] = n
+        self._lengths = np.array([len(name) for name in self.names], dtype=np.float64)
+        # Per character, a bit per position of each name where it occurs; names over 64 characters
+        # keep the quick_ratio bound
+        self._long = self._lengths > 64
+        masks = {ch: [0] * len(self.names) for ch in alphabet}
+        for row, name in enumerate(self.names):
+            if len(name) <= 64:
+                for i, ch in enumerate(name):
+                    masks[ch][row] |= 1 << i
+        self._masks = {ch: np.array(mask, dtype=np.uint64) for ch, mask in masks.items()}
+        self._length_masks = np.array([(1 << min(len(name), 64)) - 1 for name in self.names], dtype=np.uint64)
+
+    def best(self, query, cutoff=0.6):
+        columns, query_counts = [], []
+        for ch, n in Counter(query).items():
+            col = self._columns.get(ch)
+            if col is not None:
+                columns.append(col)
+                query_counts.append(n)
+        if not columns:
+            return None
+
+        # Shared characters per name, i.e. SequenceMatcher.quick_ratio() for every name
+        overlap = np.minimum(self._counts[:, columns], query_counts).sum(axis=1)
+        bound = 2.0 * overlap / (self._lengths + len(query))
+
+        rows = np.flatnonzero(bound >= cutoff)
+        if len(rows) > LCS_MIN_ROWS:
+            lcs_bound = 2.0 * self._lcs(query, rows) / (self._lengths[rows] + len(query))
+            bound[rows] = np.where(self._long[rows], bound[rows], lcs_bound)
+            rows = rows[bound[rows] >= cutoff]
+        if not len(rows):
+            return None
+
+        # Highest bound first: once a bound drops below the best ratio seen, nothing later can win
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        best = None
+        for row in rows[np.argsort(-bound[rows], kind="stable")]:
+            if best is not None and bound[row] < best[0]:
+                break
+            name = self.names[row]
+            matcher.set_seq1(name)
+            score = matcher.ratio()
+            if score >= cutoff and (best is None or (score, name) > best):
+                best = (score, name)
+        return best[1] if best else None
+
+    def _lcs(self, query, rows):
+        """Longest common subsequence length of query with each name in rows (Hyyro's bit-vector recurrence)"""
+        v = np.full(len(rows), ~np.uint64(0))
+        for ch in query:
+            mask = self._masks.get(ch)
+            if mask is not None:
+                u = v & mask[rows]
+                v = (v + u) | (v - u)
+        matched = ~v & self._length_masks[rows]
+        return np.unpackbits(matched.view(np.uint8)).reshape(len(rows), 64).sum(axis=1)
@@ -0,0 +1,8 @@
+# Picked up automatically by `gunicorn app:app` (and `gunicorn asgi:application`)
+
+
+def post_worker_init(worker):
+    # Each worker opens its own MongoDB client and starts loading data right after fork,
+    # rather than on its first request
+    import app
+    app.start_data_layer()
@@ -0,0 +1,217 @@
+"""Product vocabulary, catalog metadata and blocked words, loaded from a JSON file
+
+The file is validated and compiled as a whole before it replaces the version
+in service, so a bad edit is logged and ignored. Each worker notices a new
+file within LEXICON_CHECK_INTERVAL seconds (replace it with a rename, e.g.
+``mv lexicon.json.new lexicon.json``), or at once on SIGHUP sent to that worker.
+"""
+import json
+import logging
+import os
+import signal
+import threading
+import time
+
+from normalize import fold
+
+logger = logging.getLogger(__name__)
+
+LEXICON_CHECK_INTERVAL = float(os.environ.get("LEXICON_CHECK_INTERVAL", "5"))
+
+# term -> product name
+TERM_MAPS = ("tanglish_map", "alias_map")
+# product name -> list of strings
+PRODUCT_LISTS = ("recommendations", "product_benefits")
+# Whole-word keywords that block a message
+KEYWORD_LISTS = ("offensive_keywords", "unrelated_keywords")
+
+# Map target meaning "some oil, product unknown"
+GENERIC_OIL = "oil"
+
+
+class LexiconError(ValueError):
+    """The lexicon file is malformed, has duplicates or contradicts itself"""
+
+
+def _reject_duplicate_keys(pairs):
+    seen = {}
+    for key, value in pairs:
+        if key in seen:
+            raise LexiconError(f"duplicate key {key!r}")
+        seen[key] = value
+    return seen
+
+
+def _check_keyword(section, keyword):
+    if not isinstance(keyword, str) or not keyword:
+        raise LexiconError(f"{section}: {keyword!r} is not a keyword")
+    if keyword != fold(keyword):
+        # Messages are scanned in folded form (normalize.py), so these could never match
+        raise LexiconError(f"{section}: {keyword!r} must be lowercase, single-spaced and free of punctuation and accents")
+
+
+def _check_shadowing(terms):
+    """Reject a term containing an earlier term for another product
+
+    Terms match anywhere in a message and the first one listed wins, so
+    "vennai" listed after "ennai" could never match.
+    """
+    earlier = []
+    for term, name in terms.items():
+        for other, other_name in earlier:
+            if other in term and other_name != name:
+                raise LexiconError(f"{term!r} contains {other!r}, listed earlier for {other_name!r}; list {term!r} first")
+        earlier.append((term, name))
+
+
+def validate(lexicon, products=()):
+    """Raise LexiconError unless lexicon is usable; products are the known product names"""
+    if not isinstance(lexicon, dict):
+        raise LexiconError("top level must be an object")
+    missing = [s for s in ("version", *TERM_MAPS, *PRODUCT_LISTS, "product_links", *KEYWORD_LISTS) if s not in lexicon]
+    if missing:
+        raise LexiconError(f"missing sections: {', '.join(missing)}")
+    if not isinstance(lexicon["version"], (str, int)) or isinstance(lexicon["version"], bool):
+        raise LexiconError("version must be a string or integer")
+
+    known = set(products)
+
+    def check_product(section, name):
+        if known and name not in known:
+            raise LexiconError(f"{section}: unknown product {name!r}")
+
+    targets = {}
+    for section in TERM_MAPS:
+        if not isinstance(lexicon[section], dict):
+            raise LexiconError(f"{section} must be an object")
+        for term, name in lexicon[section].items():
+            _check_keyword(section, term)
+            if not isinstance(name, str):
+                raise LexiconError(f"{section}: {term!r} must map to a product name")
+            if name != GENERIC_OIL:
+                check_product(section, name)
+            if term in targets:
+                raise LexiconError(f"{section}: {term!r} is already in {targets[term]}")
+            targets[term] = section
+    _check_shadowing({**lexicon["tanglish_map"], **lexicon["alias_map"]})
+
+    for section in (*PRODUCT_LISTS, "product_links"):
+        if not isinstance(lexicon[section], dict):
+            raise LexiconError(f"{section} must be an object")
+        for name, value in lexicon[section].items():
+            check_product(section, name)
+            if section == "product_links":
+                if not isinstance(value, str) or not value.startswith(("https://", "http://")):
+                    raise LexiconError(f"{section}: {name!r} needs an http(s) URL")
+                continue
+            if not isinstance(value, list) or not all(isinstance(v, str) and v for v in value):
+                raise LexiconError(f"{section}: {name!r} must be a list of strings")
+            if len(set(value)) != len(value):
+                raise LexiconError(f"{section}: {name!r} lists an entry twice")
+            if section == "recommendations":
+                for other in value:
+                    check_product(section, other)
+                if name in value:
+                    raise LexiconError(f"{section}: {name!r} recommends itself")
+
+    blocked = {}
+    for section in KEYWORD_LISTS:
+        if not isinstance(lexicon[section], list):
+            raise LexiconError(f"{section} must be a list")
+        for keyword in lexicon[section]:
+            _check_keyword(section, keyword)
+            if keyword in blocked:
+                raise LexiconError(f"{section}: {keyword!r} is already in {blocked[keyword]}")
+            if keyword in targets:
+                raise LexiconError(f"{section}: {keyword!r} is also a product term in {targets[keyword]}")
+            blocked[keyword] = section
+
+
+def load_lexicon(path, products=()):
+    """Parsed and validated lexicon file; raises OSError or LexiconError"""
+    with open(path, encoding="utf-8") as f:
+        try:
+            lexicon = json.load(f, object_pairs_hook=_reject_duplicate_keys)
+        except json.JSONDecodeError as e:
+            raise LexiconError(str(e)) from None
+    validate(lexicon, products)
+    return lexicon
+
+
+class Lexicon:
+    """The lexicon file compiled by ``compile(lexicon)``, recompiled when the file changes
+
+    ``current`` is the compiled object in service; a reload builds a complete new
+    one and swaps it in with a single assignment, then calls ``on_reload``. The
+    first load happens in the constructor and raises on a bad file; later bad
+    files are logged and the last good version stays in service.
+    """
+
+    name = "lexicon"
+
+    def __init__(self, path, compile, products=(), on_reload=None, interval=LEXICON_CHECK_INTERVAL):
+        self.path = path
+        self.compile = compile
+        self.products = tuple(products)
+        self.on_reload = on_reload
+        self.interval = interval
+        self.version = None
+        self.generation = 0
+        self.updated_at = None
+        self.error = None
+        self._force = threading.Event()
+        self._watcher = None
+        self._watcher_pid = None
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._load()
+
+    def reload(self, force=False):
+        """Load the file again if it changed (or force); True if a new version went into service"""
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime == self._mtime and not force:
+                    return False
+                self._mtime = mtime  # a bad file is only reported once
+                self._load()
+            except (OSError, LexiconError) as e:
+                logger.error("Keeping lexicon %s: %s is invalid: %s", self.version, self.path, e)
+                self.error = str(e)
+                return False
+        if self.on_reload:
+            self.on_reload(self.current)
+        return True
+
+    def start(self):
+        """Watch the file from a background thread, once per process"""
+        if self._watcher_pid == os.getpid() and self._watcher.is_alive():
+            return
+        self._watcher = threading.Thread(target=self._run, name="lexicon-watch", daemon=True)
+        self._watcher_pid = os.getpid()
+        self._watcher.start()
+        if threading.current_thread() is threading.main_thread():
+            # Signal handlers can only be installed from the main thread
+            signal.signal(signal.SIGHUP, lambda signum, frame: self._force.set())
+
+    def status(self):
+        return {"version": self.version, "generation": self.generation, "updated_at": self.updated_at, "error": self.error}
+
+    def _load(self):
+        lexicon = load_lexicon(self.path, self.products)
+        self.current = self.compile(lexicon)
+        self.version = lexicon["version"]
+        self.generation += 1
+        self.updated_at = time.time()
+        self.error = None
+        logger.info("Lexicon %s loaded from %s", self.version, self.path)
+
+    def _run(self):
+        while True:
+            forced = self._force.wait(self.interval)
+            self._force.clear()
+            try:
+                self.reload(force=forced)
+            except Exception as e:
+                # A failing on_reload must not stop the watcher
+                logger.error("Lexicon reload failed: %s", e)
@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+import time
+
+import pymongo
+from bson import json_util
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Retry delays (seconds) while the first live load keeps failing
+INITIAL_RETRY_DELAYS = (1, 2, 5, 10, 30)
+
+# Longest one refresh may spend in the database before it counts as failed
+REFRESH_DEADLINE = float(os.environ.get("REFRESH_DEADLINE_MS", "30000")) / 1000
+
+
+class LiveState:
+    """In-process copy of collection data, kept fresh by a per-process background thread
+
+    Subclasses implement ``_refresh()`` (load from the database and swap the new
+    state in), ``dump()``/``restore()`` for the on-disk snapshot, and optionally
+    ``on_change()`` for change-stream events. Nothing touches the database until
+    ``start()``, which is meant to run after fork in each worker: it loads live
+    data in the background, then follows the change stream or polls every
+    ``ttl`` seconds. Until the first live load the last snapshot written to
+    ``snapshot_path`` is served. A refresh gets ``refresh_deadline`` seconds
+    (None for no limit); while refreshes fail, ``stale`` is true. Subclasses
+    whose refresh reads more than ``collection`` set ``follow_changes`` False
+    to always poll.
+    """
+
+    name = "state"
+    refresh_deadline = REFRESH_DEADLINE
+    follow_changes = True
+
+    def __init__(self, collection, ttl, snapshot_path=None):
+        self.collection = collection
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.source = "empty"
+        self.updated_at = None
+        self.error = None
+        self._available = threading.Event()
+        self._watcher = None
+        self._watcher_pid = None
+        if snapshot_path:
+            self._load_snapshot()
+
+    def refresh(self):
+        with pymongo.timeout(self.refresh_deadline):
+            self._refresh()
+        self._save_snapshot()
+        self.error = None
+        self._mark("live")
+
+    def on_change(self, change):
+        self.refresh()
+
+    def dump(self):
+        raise NotImplementedError
+
+    def restore(self, data):
+        raise NotImplementedError
+
+    def wait(self, timeout):
+        """Block until some data (disk snapshot or live) is available; True if it is"""
+        return self._available.wait(timeout)
+
+    def has_data(self):
+        return self._available.is_set()
+
+    @property
+    def stale(self):
+        """True unless the data came from the last live load and the latest refresh succeeded"""
+        return self.source != "live" or self.error is not None
+
+    def status(self):
+        return {"source": self.source, "updated_at": self.updated_at, "error": self.error}
+
+    def start(self):
+        """Start the background loader once per process"""
+        if self._watcher_pid == os.getpid() and self._watcher.is_alive():
+            return
+        self._watcher = threading.Thread(target=self._run, name=f"{self.name}-refresh", daemon=True)
+        self._watcher_pid = os.getpid()
+        self._watcher.start()
+
+    def _mark(self, source):
+        self.source = source
+        self.updated_at = time.time()
+        self._available.set()
+
+    def _run(self):
+        for delay in INITIAL_RETRY_DELAYS + (None,):
+            try:
+                self.refresh()
+                break
+            except PyMongoError as e:
+                logger.warning("Initial %s load failed: %s", self.name, e)
+                self.error = str(e)
+                if delay is None:
+                    break
+                time.sleep(delay)
+        if self.follow_changes:
+            self._follow()
+        self._poll_loop()
+
+    def _follow(self):
+        try:
+            with self.collection.watch(full_document="updateLookup") as stream:
+                for change in stream:
+                    self.on_change(change)
+        except ConnectionFailure as e:
+            # Lost the server; flagged stale until a poll succeeds
+            self.error = str(e)
+        except Exception:
+            # No change streams here (standalone server, mock); poll instead
+            pass
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.ttl)
+            try:
+                self.refresh()
+            except PyMongoError as e:
+                # Keep serving the last good state until the next poll
+                self.error = str(e)
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as f:
+                self.restore(json_util.loads(f.read()))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable %s snapshot %s: %s", self.name, self.snapshot_path, e)
+            return
+        self._mark("disk")
+
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            with open(tmp, "w") as f:
+                f.write(json_util.dumps(self.dump()))
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            logger.warning("Could not write %s snapshot %s: %s", self.name, self.snapshot_path, e)
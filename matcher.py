@@ -0,0 +1,103 @@
+from collections import namedtuple
+
+Hit = namedtuple("Hit", "start end keyword")
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class MatchResult:
+    """Every keyword hit from one scan, indexed by keyword group"""
+
+    __slots__ = ("text", "hits", "groups")
+
+    def __init__(self, text, hits, groups):
+        self.text = text
+        self.hits = hits
+        self.groups = groups
+
+    def has(self, group):
+        return group in self.groups
+
+    def keywords(self, group):
+        """Keywords of a group that occurred in the text, in order of first occurrence"""
+        return list(dict.fromkeys(h.keyword for h in self.groups.get(group, ())))
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over named keyword groups
+
+    Built once from ``{group: keywords}``; ``scan()`` walks the text a single time
+    and reports every occurrence (overlapping ones included). Groups listed in
+    ``word_groups`` only count whole-word hits, matching ``re.findall(r'\\w+')``
+    tokenization.
+    """
+
+    def __init__(self, groups, word_groups=()):
+        self.word_groups = frozenset(word_groups)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        self._groups = {}
+        for group, keywords in groups.items():
+            for kw in keywords:
+                self._groups.setdefault(kw, []).append(group)
+                self._insert(kw)
+        self._build()
+
+    def _insert(self, keyword):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        if keyword not in self._out[node]:
+            self._out[node] = self._out[node] + (keyword,)
+
+    def _build(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fail = self._goto[f].get(ch, 0)
+                self._fail[child] = fail if fail != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def scan(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kw in out[node]:
+                hits.append(Hit(i + 1 - len(kw), i + 1, kw))
+        hits.sort()
+
+        groups = {}
+        for hit in hits:
+            whole_word = None
+            for group in self._groups[hit.keyword]:
+                if group in self.word_groups:
+                    if whole_word is None:
+                        whole_word = (
+                            (hit.start == 0 or not _is_word_char(text[hit.start - 1]))
+                            and (hit.end == len(text) or not _is_word_char(text[hit.end]))
+                        )
+                    if not whole_word:
+                        continue
+                groups.setdefault(group, []).append(hit)
+        return MatchResult(text, hits, groups)
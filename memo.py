@@ -0,0 +1,57 @@
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+
+RESOLUTION_MEMO_SIZE = int(os.environ.get("RESOLUTION_MEMO_SIZE", "4096"))
+
+
+class Memo:
+    """Bounded LRU of computed values for the current data version, with hit and miss counts
+
+    ``version`` is whatever identifies the data the values were computed from;
+    the first store under a new version drops everything stored before it,
+    and a lookup under any other version misses.
+    """
+
+    def __init__(self, name, max_entries=RESOLUTION_MEMO_SIZE):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hit_counter = metrics.MEMO_LOOKUPS.labels(name, "hit")
+        self._miss_counter = metrics.MEMO_LOOKUPS.labels(name, "miss")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """The value stored for key under version, or None"""
+        with self._lock:
+            value = self._entries.get(key) if version == self._version else None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        (self._miss_counter if value is None else self._hit_counter).inc()
+        return value
+
+    def put(self, key, version, value):
+        with self._lock:
+            if version != self._version:
+                self._entries = OrderedDict()
+                self._version = version
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def status(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None}
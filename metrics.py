@@ -0,0 +1,111 @@
+"""Prometheus metrics for chatbot turns, routing helpers and MongoDB commands
+
+Under gunicorn set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the
+workers (cleared on every deploy); /metrics then aggregates all of them.
+"""
+import functools
+import os
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+from pymongo import monitoring
+
+TURN_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+HELPER_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)
+
+TURNS = Counter(
+    "chatbot_turns_total", "Messages answered, by endpoint, resolved intent and product",
+    ["endpoint", "intent", "product"],
+)
+TURN_SECONDS = Histogram(
+    "chatbot_turn_seconds", "Time to answer one /chatbot message, by resolved intent and product",
+    ["intent", "product"], buckets=TURN_BUCKETS,
+)
+BATCH_SECONDS = Histogram("chatbot_batch_seconds", "Time to answer one /chatbot/batch request", buckets=TURN_BUCKETS)
+HELPER_SECONDS = Histogram("chatbot_helper_seconds", "Time spent in routing helpers", ["helper"], buckets=HELPER_BUCKETS)
+CLASSIFIER_RESULTS = Counter(
+    "chatbot_classifier_results_total", "Rule misses the fallback classifier answered, by intent, or rejected", ["intent"],
+)
+MEMO_LOOKUPS = Counter("chatbot_memo_lookups_total", "Memo lookups answered from the memo or missed", ["memo", "outcome"])
+
+MONGO_COMMANDS = Counter("mongo_commands_total", "MongoDB commands sent", ["collection", "command", "outcome"])
+MONGO_SECONDS = Histogram("mongo_command_seconds", "MongoDB command round trip time", ["collection", "command"])
+MONGO_DOCUMENTS = Counter("mongo_documents_returned_total", "Documents returned by MongoDB cursors", ["collection", "command"])
+MONGO_BREAKER_EVENTS = Counter(
+    "mongo_breaker_events_total", "Circuit breaker openings, closings and calls rejected while open", ["breaker", "event"],
+)
+
+QUERY_LOG_RECORDS = Counter("query_log_records_total", "Query log records written, dropped or failed", ["outcome"])
+
+
+def observe_turn(endpoint, turn, seconds=None):
+    """Count one answered message (turn is None when it could not be resolved)"""
+    intent, product = (turn.intent, turn.product or "") if turn else ("error", "")
+    if isinstance(product, tuple):
+        product = "+".join(product)  # comparisons
+    TURNS.labels(endpoint, intent, product).inc()
+    if seconds is not None:
+        TURN_SECONDS.labels(intent, product).observe(seconds)
+
+
+def timed(helper):
+    """Decorator recording each call's duration under chatbot_helper_seconds{helper=...}"""
+    def decorate(fn):
+        histogram = HELPER_SECONDS.labels(helper)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Counts every command a client sends, its latency and the documents its cursor returns
+
+    Pass an instance in ``event_listeners`` when creating a MongoClient (or Motor client).
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        name = event.command_name
+        collection = event.command.get("collection") if name == "getMore" else event.command.get(name)
+        with self._lock:
+            self._inflight[event.request_id] = (collection if isinstance(collection, str) else "", name)
+
+    def succeeded(self, event):
+        labels = self._finish(event, "ok")
+        cursor = event.reply.get("cursor")
+        if isinstance(cursor, dict):
+            batch = cursor.get("firstBatch", cursor.get("nextBatch", ()))
+            MONGO_DOCUMENTS.labels(*labels).inc(len(batch))
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome):
+        with self._lock:
+            labels = self._inflight.pop(event.request_id, ("", event.command_name))
+        MONGO_COMMANDS.labels(*labels, outcome).inc()
+        MONGO_SECONDS.labels(*labels).observe(event.duration_micros / 1e6)
+        return labels
+
+
+def exposition():
+    """(body, content type) of the Prometheus text format for this process or all workers"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,130 @@
+"""Message normalization: the one form of a message that scanning, routing and the resolution memo see
+
+``normalize()`` folds case and Unicode compatibility forms, strips accents
+from Latin letters (other scripts are left whole, their vowel signs are
+combining marks too), turns punctuation and symbols into spaces, keeps
+apostrophes, hyphens and slashes inside words ("what's", "top-rated", "0/0")
+and collapses whitespace; that much is ``fold()``, which keywords must
+already be in. It then shortens letters repeated three or more times to two
+("hiii", "priceee"). Given the ``Spellings`` of a vocabulary, words the
+vocabulary uses are left exactly as typed ("xxx"), and transliteration
+variants of its words are respelled its way ("thenga ennai" -> "thengai
+ennai").
+"""
+import functools
+import re
+import unicodedata
+
+# Characters NFKC leaves alone that people type for these
+QUOTES = {"‘": "'", "’": "'", "‛": "'", "ʼ": "'", "`": "'", "´": "'"}
+DASHES = {"‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "−": "-"}
+# Invisible separators between words, unlike the zero-width joiners some scripts need within one
+INVISIBLE_SPACES = {"\u200b", "\u2060", "\ufeff"}
+# Kept inside a word, dropped at its edges
+WORD_JOINERS = "'-/"
+
+# fold_char() of every ASCII character, as a bytes.translate() table for the common all-ASCII message
+ASCII_FOLD = bytes(i if chr(i).isalnum() or chr(i).isspace() or chr(i) in WORD_JOINERS else 32 for i in range(256))
+
+REPEATS_RE = re.compile(r"(\w)\1{2,}")
+
+# Ordered rewrites bringing Tanglish spellings of one word to a common key
+SPELLING_RULES = [
+    (re.compile(r"(\w)\1+"), r"\1"),  # doubled letters: karuppatti, nallennai
+    (re.compile(r"^y(?=[aeiou])"), ""),  # yennai
+    (re.compile(r"th"), "t"),
+    (re.compile(r"dh"), "d"),
+    (re.compile(r"zh"), "l"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"ee"), "i"),
+    (re.compile(r"oo"), "u"),
+    (re.compile(r"(?:ai|ay|ei)$"), "a"),  # thengai, thenga; kadalai, kadala
+]
+# Shorter words are too easily some other word
+MIN_VARIANT_LENGTH = 4
+
+
+@functools.lru_cache(maxsize=4096)
+def fold_char(ch):
+    """What one character of casefolded NFKC text becomes: itself, an ASCII letter, a joiner, a space or nothing"""
+    if ch.isascii():
+        return ch if ch.isalnum() or ch.isspace() or ch in WORD_JOINERS else " "
+    if ch in QUOTES:
+        return QUOTES[ch]
+    if ch in DASHES:
+        return DASHES[ch]
+    category = unicodedata.category(ch)
+    if category[0] in "PSZ" or ch in INVISIBLE_SPACES:
+        return " "
+    if category == "Cf":
+        return ""  # zero-width joiners, soft hyphens
+    if category[0] == "L":
+        stripped = "".join(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c))
+        if stripped.isascii() and stripped:
+            return stripped  # é -> e, ñ -> n
+    return ch
+
+
+def fold(text):
+    """Casefolded, accent-free, punctuation-free, single-spaced text; keywords are in this form"""
+    if text.isascii():
+        text = text.lower().encode().translate(ASCII_FOLD).decode()
+    else:
+        text = "".join(fold_char(ch) for ch in unicodedata.normalize("NFKC", text).casefold())
+    words = (word.strip(WORD_JOINERS) for word in text.split())
+    return " ".join(word for word in words if word)
+
+
+@functools.lru_cache(maxsize=16384)
+def shorten_repeats(text):
+    return REPEATS_RE.sub(r"\1\1", text) if REPEATS_RE.search(text) else text
+
+
+@functools.lru_cache(maxsize=16384)
+def spelling_key(word):
+    """Common key of the transliteration variants of a word"""
+    for pattern, replacement in SPELLING_RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+class Spellings:
+    """Transliteration variants of a vocabulary's words, respelled the vocabulary's way
+
+    ``words`` are the spellings to respell to; a key two of them share, or one
+    of them shares with a ``keep`` word, is left out. ``keep`` words (and
+    ``words`` themselves) are never changed, not even their repeated letters,
+    so a word some rule matches as typed stays as typed.
+    """
+
+    def __init__(self, words, keep=()):
+        self.keep = frozenset(words) | frozenset(keep)
+        table, ambiguous = {}, set()
+        for word in words:
+            if len(word) < MIN_VARIANT_LENGTH:
+                continue
+            key = spelling_key(word)
+            if table.get(key, word) != word:
+                ambiguous.add(key)
+            table[key] = word
+        # An everyday word with a product word's key ("enna" and "ennai") makes the key no evidence of the product
+        for word in self.keep:
+            if table.get(spelling_key(word), word) != word:
+                ambiguous.add(spelling_key(word))
+        self.table = {key: word for key, word in table.items() if key not in ambiguous}
+
+    def respell(self, word):
+        if word in self.keep:
+            return word
+        word = shorten_repeats(word)
+        if len(word) < MIN_VARIANT_LENGTH or word in self.keep:
+            return word
+        return self.table.get(spelling_key(word), word)
+
+
+def normalize(text, spellings=None):
+    """The normalized form of a message, with variants respelled if given Spellings"""
+    text = fold(text)
+    if spellings is None:
+        return shorten_repeats(text)
+    return " ".join(spellings.respell(word) for word in text.split())
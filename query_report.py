@@ -0,0 +1,122 @@
+"""Offline report over the query log: unmatched queries and Tanglish/alias candidates
+
+    python query_report.py [--days 7] [--top 30] [logs/queries-*.jsonl ...]
+
+Reads the query_log collection (MONGO_URI) when no files are given, else the
+JSON-lines files the file sink wrote. Run from the repository root, like the
+app. Words the keyword tables already know are masked out of each query; what
+is left is grouped two ways:
+
+* alias candidates: unknown words of queries the fuzzy fallback resolved,
+  with the product they resolved to - the ones seen often belong in
+  lexicon.json
+* unmatched clusters: unknown words of queries no keyword rule matched (the
+  default answer, or the fallback classifier's guess), clustered by spelling,
+  with the closest product name as a suggestion
+"""
+import argparse
+import glob
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+
+from bson import json_util
+
+import app
+from review_search import STOPWORDS, TOKEN_RE
+
+CLUSTER_SIMILARITY = 0.75
+SUGGEST_CUTOFF = 0.5
+
+
+def read_records(paths, since):
+    if not paths:
+        query = {"at": {"$gte": since}} if since else {}
+        yield from app.mongo.collection("query_log").find(query, {"_id": 0})
+        return
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)):
+            with open(path) as f:
+                for line in f:
+                    record = json_util.loads(line)
+                    at = record.get("at")
+                    if since and at and at.replace(tzinfo=at.tzinfo or timezone.utc) < since:
+                        continue
+                    yield record
+
+
+def unknown_words(text):
+    """Words of text outside every keyword the router matched, and outside stopwords/fillers"""
+    known = [False] * len(text)
+    for hit in app.scan_input(text).hits:
+        known[hit.start:hit.end] = [True] * (hit.end - hit.start)
+    words = []
+    for m in TOKEN_RE.finditer(text.lower()):
+        word = m.group()
+        if any(known[m.start():m.end()]) or word in STOPWORDS or word in app.FOLLOW_UP_WORDS or word.isdigit():
+            continue
+        words.append(word)
+    return words
+
+
+def cluster(counts):
+    """Group words whose spelling is within CLUSTER_SIMILARITY of a more frequent word"""
+    clusters = []
+    matcher = SequenceMatcher()
+    for word, n in counts.most_common():
+        matcher.set_seq2(word)
+        for head in clusters:
+            matcher.set_seq1(head[0])
+            if matcher.ratio() >= CLUSTER_SIMILARITY:
+                head[1][word] = n
+                break
+        else:
+            clusters.append((word, Counter({word: n})))
+    return clusters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("paths", nargs="*", help="query log JSON-lines files (globs allowed); default: MongoDB")
+    parser.add_argument("--days", type=float, default=7, help="only records this recent (0 for all)")
+    parser.add_argument("--top", type=int, default=30)
+    args = parser.parse_args()
+    since = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+
+    methods = Counter()
+    aliases = Counter()
+    alias_examples = {}
+    unmatched = Counter()
+    unmatched_examples = defaultdict(list)
+    for record in read_records(args.paths, since):
+        methods[record.get("method")] += 1
+        text = record.get("input") or ""
+        if record.get("method") == "fuzzy":
+            for word in unknown_words(text):
+                aliases[word, record.get("product")] += 1
+                alias_examples.setdefault((word, record.get("product")), text)
+        elif record.get("intent") == "default" or record.get("method") == "classifier":
+            for word in unknown_words(text):
+                unmatched[word] += 1
+                if len(unmatched_examples[word]) < 3 and text not in unmatched_examples[word]:
+                    unmatched_examples[word].append(text)
+
+    total = sum(methods.values())
+    print(f"{total} turns: " + ", ".join(f"{m} {n}" for m, n in methods.most_common()))
+
+    print(f"\nAlias candidates (fuzzy matches), top {args.top}")
+    for (word, product), n in aliases.most_common(args.top):
+        print(f"  {n:6d}  {word!r} -> {product!r}    e.g. {alias_examples[word, product]!r}")
+
+    print(f"\nUnmatched clusters (default answers and classifier guesses), top {args.top}")
+    clusters = sorted(cluster(unmatched), key=lambda c: -sum(c[1].values()))
+    for head, words in clusters[:args.top]:
+        suggestion = app.lexicon.current.product_name_index.best(head, cutoff=SUGGEST_CUTOFF)
+        variants = ", ".join(f"{w} ({n})" for w, n in words.most_common(5))
+        print(f"  {sum(words.values()):6d}  {variants}" + (f"  -> {suggestion!r}?" if suggestion else ""))
+        for example in unmatched_examples[head]:
+            print(f"            e.g. {example!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import logging
+import logging.handlers
+import os
+import threading
+from collections import deque
+
+from bson import json_util
+from pymongo.errors import OperationFailure
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_CAPACITY = int(os.environ.get("QUERY_LOG_CAPACITY", "10000"))
+QUERY_LOG_BATCH = int(os.environ.get("QUERY_LOG_BATCH", "500"))
+QUERY_LOG_INTERVAL = float(os.environ.get("QUERY_LOG_INTERVAL", "2"))
+
+# Server error codes for an index that exists with other options
+INDEX_CONFLICT_CODES = {85, 86}
+
+
+class MongoSink:
+    """Writes each batch with one unordered insert_many
+
+    With ``retention_days``, ``ensure_indexes()`` has MongoDB delete records
+    that many days after their "at" (a TTL index, which also serves reads of a
+    recent time range), so the collection stays bounded.
+    """
+
+    def __init__(self, collection, retention_days=None):
+        self.collection = collection
+        self.retention_days = retention_days
+
+    def write(self, records):
+        self.collection.insert_many(records, ordered=False)
+
+    def ensure_indexes(self):
+        if not self.retention_days:
+            return
+        seconds = int(self.retention_days * 86400)
+        try:
+            self.collection.create_index("at", expireAfterSeconds=seconds)
+        except OperationFailure as e:
+            if e.code not in INDEX_CONFLICT_CODES:
+                raise
+            # Created with another retention; change it in place
+            self.collection.database.command(
+                "collMod", self.collection.name, index={"keyPattern": {"at": 1}, "expireAfterSeconds": seconds}
+            )
+
+
+class FileSink:
+    """Appends JSON lines to a size-rotated file; ``{pid}`` in the path gives each worker its own"""
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._handler = None
+        self._pid = None
+
+    def write(self, records):
+        if self._pid != os.getpid():
+            path = self.path.format(pid=os.getpid())
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=self.max_bytes, backupCount=self.backup_count)
+            self._pid = os.getpid()
+        for record in records:
+            self._handler.emit(logging.makeLogRecord({"msg": json_util.dumps(record)}))
+        self._handler.flush()
+
+
+class QueryLog:
+    """Turn records kept in a bounded ring buffer and written in batches by a background thread
+
+    ``log()`` never blocks or touches the sink: when the buffer is full the
+    oldest record is overwritten and counted as dropped, and a failing sink
+    only loses the batch it was given. Counts go to
+    query_log_records_total{outcome=written|dropped|failed}.
+    """
+
+    def __init__(self, sink, capacity=QUERY_LOG_CAPACITY, batch_size=QUERY_LOG_BATCH, interval=QUERY_LOG_INTERVAL):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self._buffer = deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._writer = None
+        self._writer_pid = None
+        self._written = metrics.QUERY_LOG_RECORDS.labels("written")
+        self._dropped = metrics.QUERY_LOG_RECORDS.labels("dropped")
+        self._failed = metrics.QUERY_LOG_RECORDS.labels("failed")
+
+    def log(self, record):
+        if len(self._buffer) == self._buffer.maxlen:
+            self._dropped.inc()
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def start(self):
+        """Start the writer thread once per process"""
+        if self._writer_pid == os.getpid() and self._writer.is_alive():
+            return
+        if self._writer_pid is not None:
+            self._buffer.clear()  # forked: these records belong to the parent's writer
+        self._writer = threading.Thread(target=self._run, name="query-log", daemon=True)
+        self._writer_pid = os.getpid()
+        self._writer.start()
+
+    def flush(self):
+        """Write everything buffered so far; returns how many records were written"""
+        written = 0
+        while self._buffer:
+            batch = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+            try:
+                self.sink.write(batch)
+            except Exception as e:
+                # The sink is down or slow to recover; drop this batch rather than pile up
+                logger.warning("Query log write of %d records failed: %s", len(batch), e)
+                self._failed.inc(len(batch))
+                continue
+            self._written.inc(len(batch))
+            written += len(batch)
+        return written
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
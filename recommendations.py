@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from live_state import LiveState
+
+RECOMMEND_TTL = float(os.environ.get("RECOMMEND_TTL", "900"))
+RECOMMEND_TOP_K = int(os.environ.get("RECOMMEND_TOP_K", "4"))
+# Pairs seen fewer times than this are noise, not a recommendation
+RECOMMEND_MIN_COUNT = int(os.environ.get("RECOMMEND_MIN_COUNT", "3"))
+RECOMMEND_LOG_DAYS = float(os.environ.get("RECOMMEND_LOG_DAYS", "30"))
+RECOMMEND_SESSIONS = int(os.environ.get("RECOMMEND_SESSIONS", "10000"))
+# Live counts change the served lists at most this often, since each change drops the fragment cache
+RECOMMEND_PUBLISH_INTERVAL = float(os.environ.get("RECOMMEND_PUBLISH_INTERVAL", "60"))
+
+# Products each customer reviewed, for customers with at least two
+REVIEW_GROUPS = [
+    {"$match": {"userId": {"$ne": None}}},
+    {"$group": {"_id": "$userId", "products": {"$addToSet": "$productId"}}},
+    {"$match": {"products.1": {"$exists": True}}},
+]
+
+
+def session_groups(since):
+    """Products asked about in each query-log session since a time, for sessions with at least two"""
+    return [
+        {"$match": {"at": {"$gte": since}, "session": {"$ne": None}, "product": {"$ne": None}}},
+        {"$unwind": "$product"},  # comparisons log a list
+        {"$group": {"_id": "$session", "products": {"$addToSet": "$product"}}},
+        {"$match": {"products.1": {"$exists": True}}},
+    ]
+
+
+class CoOccurrence:
+    """Symmetric product pair counts in a square int32 array, grown by doubling
+
+    Products get a row in the order they are first seen.
+    """
+
+    def __init__(self, capacity=8):
+        self.names = []
+        self.index = {}
+        self.counts = np.zeros((capacity, capacity), dtype=np.int32)
+
+    def row(self, name):
+        i = self.index.get(name)
+        if i is None:
+            i = len(self.names)
+            if i == len(self.counts):
+                grown = np.zeros((2 * i, 2 * i), dtype=np.int32)
+                grown[:i, :i] = self.counts
+                self.counts = grown
+            self.names.append(name)
+            self.index[name] = i
+        return i
+
+    def add(self, products, seen=()):
+        """Count the pairs new products form with each other and with the group's products seen before
+
+        Returns the rows whose counts changed.
+        """
+        old = list(dict.fromkeys(self.row(p) for p in seen))
+        new = [i for i in dict.fromkeys(self.row(p) for p in products) if i not in old]
+        if not new or len(old) + len(new) < 2:
+            return []
+        rows = np.array(old + new)
+        # Every pair among the group's products now, minus the pairs among the old ones counted before
+        self.counts[np.ix_(rows, rows)] += 1
+        self.counts[rows, rows] -= 1
+        if len(old) > 1:
+            old = np.array(old)
+            self.counts[np.ix_(old, old)] -= 1
+            self.counts[old, old] += 1
+        return rows.tolist()
+
+    def top(self, row, k, min_count):
+        """Names of the k products most often paired with a row's, at least min_count times"""
+        counts = self.counts[row, :len(self.names)]
+        partners = [i for i in np.flatnonzero(counts >= min_count).tolist() if i != row]
+        partners.sort(key=lambda i: (-counts[i], self.names[i]))
+        return tuple(self.names[i] for i in partners[:k])
+
+    def top_lists(self, k, min_count):
+        lists = {name: self.top(i, k, min_count) for name, i in self.index.items()}
+        return {name: top for name, top in lists.items() if top}
+
+
+class Recommendations(LiveState):
+    """"Customers also buy" lists from products reviewed by the same customer or asked about in one session
+
+    A refresh rebuilds the pair counts from the reviews (grouped by userId) and
+    the last RECOMMEND_LOG_DAYS of the query log (grouped by session; without
+    one, the sessions this worker has seen), then precomputes each product's
+    top ``top_k`` partners seen at least ``min_count`` times. Between refreshes
+    ``observe()`` adds this worker's live sessions to the counts; the rows they
+    touch are recomputed at most every RECOMMEND_PUBLISH_INTERVAL seconds.
+    ``get()`` is always one dict lookup, and ``version`` changes only when a
+    list does. Products without enough data get the caller's fallback.
+    """
+
+    name = "recommendations"
+    follow_changes = False  # the query log is read on every poll, so never wait on the reviews stream
+
+    def __init__(self, reviews, products, query_log=None, ttl=RECOMMEND_TTL, snapshot_path=None,
+                 top_k=RECOMMEND_TOP_K, min_count=RECOMMEND_MIN_COUNT):
+        self.products = products
+        self.query_log = query_log
+        self.top_k = top_k
+        self.min_count = min_count
+        self.version = 0
+        self._matrix = CoOccurrence()
+        self._top = {}
+        self._known = frozenset()
+        self._sessions = OrderedDict()
+        self._dirty = set()
+        self._published = time.monotonic()
+        self._lock = threading.Lock()
+        super().__init__(reviews, ttl, snapshot_path)
+
+    def get(self, name, fallback=()):
+        return self._top.get(name) or fallback
+
+    def observe(self, session_id, products):
+        """Count the products a live session asks about; names that are not catalog products are ignored"""
+        products = [p for p in products if p in self._known]
+        if not products:
+            return
+        with self._lock:
+            seen = self._sessions.pop(session_id, ())
+            self._sessions[session_id] = tuple(dict.fromkeys((*seen, *products)))
+            if len(self._sessions) > RECOMMEND_SESSIONS:
+                self._sessions.popitem(last=False)
+            self._dirty.update(self._matrix.add(products, seen))
+            if self._dirty and time.monotonic() - self._published >= RECOMMEND_PUBLISH_INTERVAL:
+                self._publish()
+
+    def _publish(self):
+        """Recompute the lists of the rows counted since the last publish (lock held)"""
+        top = dict(self._top)
+        for row in self._dirty:
+            name = self._matrix.names[row]
+            top[name] = self._matrix.top(row, self.top_k, self.min_count)
+            if not top[name]:
+                del top[name]
+        self._dirty.clear()
+        self._published = time.monotonic()
+        if top != self._top:
+            self._top = top
+            self.version += 1
+
+    def _refresh(self):
+        names = {p["_id"]: p["name"].lower() for p in self.products.find({}, {"name": 1})}
+        matrix = CoOccurrence()
+        for group in self.collection.aggregate(REVIEW_GROUPS):
+            matrix.add([names[p] for p in group["products"] if p in names])
+        if self.query_log is not None:
+            since = datetime.now(timezone.utc) - timedelta(days=RECOMMEND_LOG_DAYS)
+            known = set(names.values())
+            for group in self.query_log.aggregate(session_groups(since)):
+                matrix.add([p for p in group["products"] if p in known])
+        else:
+            # No query log to read sessions back from: keep the ones this worker saw
+            with self._lock:
+                live = list(self._sessions.values())
+            for products in live:
+                matrix.add(products)
+        self._swap(matrix, frozenset(names.values()))
+
+    def dump(self):
+        n = len(self._matrix.names)
+        return {"names": self._matrix.names, "counts": self._matrix.counts[:n, :n].tolist(), "known": sorted(self._known)}
+
+    def restore(self, data):
+        matrix = CoOccurrence(max(8, len(data["names"])))
+        for name in data["names"]:
+            matrix.row(name)
+        n = len(matrix.names)
+        matrix.counts[:n, :n] = data["counts"]
+        self._swap(matrix, frozenset(data["known"]))
+
+    def status(self):
+        return {**super().status(), "version": self.version, "products": len(self._top),
+                "sessions": len(self._sessions)}
+
+    def _swap(self, matrix, known):
+        top = matrix.top_lists(self.top_k, self.min_count)
+        with self._lock:
+            self._matrix = matrix
+            self._known = known
+            self._dirty.clear()
+            self._published = time.monotonic()
+            if top != self._top:
+                self._top = top
+                self.version += 1
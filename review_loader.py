@@ -0,0 +1,145 @@
+import asyncio
+import base64
+import contextlib
+import os
+
+from bson import json_util
+
+REVIEW_PAGE_SIZE = int(os.environ.get("REVIEW_PAGE_SIZE", "20"))
+
+# Only the fields replies render
+REVIEW_PROJECTION = {"productId": 1, "review": 1, "rating": 1}
+
+# Review orders; each ends on _id so a page boundary is always exact
+REVIEW_SORTS = {
+    "oldest": [("_id", 1)],
+    "newest": [("_id", -1)],
+    "highest": [("rating", -1), ("_id", -1)],
+}
+
+
+# Keep every page query an index range scan
+REVIEW_INDEXES = [
+    [("productId", 1), ("_id", 1)],
+    [("productId", 1), ("rating", -1), ("_id", -1)],
+    [("rating", -1), ("_id", -1)],
+]
+
+
+def ensure_indexes(collection):
+    for keys in REVIEW_INDEXES:
+        collection.create_index(keys)
+
+
+def encode_token(doc, sort):
+    """Opaque 'after' token pointing just past doc in the given order"""
+    key = [doc.get(field) for field, _ in REVIEW_SORTS[sort]]
+    return base64.urlsafe_b64encode(json_util.dumps(key).encode()).decode()
+
+
+def after_filter(sort, token):
+    """Keyset condition selecting documents that come after the token in the given order"""
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception:
+        raise ValueError("invalid 'after' token")
+    fields = REVIEW_SORTS[sort]
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError("invalid 'after' token")
+    branches = []
+    for i, (field, direction) in enumerate(fields):
+        branch = {f: v for (f, _), v in zip(fields[:i], values)}
+        branch[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        branches.append(branch)
+    return {"$or": branches} if len(branches) > 1 else branches[0]
+
+
+def page_filter(product_id=None, sort="oldest", after=None):
+    conditions = []
+    if product_id is not None:
+        conditions.append({"productId": product_id})
+    if after:
+        conditions.append(after_filter(sort, after))
+    if len(conditions) > 1:
+        return {"$and": conditions}
+    return conditions[0] if conditions else {}
+
+
+def split_page(docs, limit, sort):
+    """(page, next token) from up to limit + 1 documents"""
+    if len(docs) > limit:
+        return docs[:limit], encode_token(docs[limit - 1], sort)
+    return docs, None
+
+
+class ReviewLoader:
+    """Review pages needed to answer one request or one batch
+
+    Pages are keyset-paginated, projected to REVIEW_PROJECTION and memoized per
+    loader. ``prefetch()`` loads the first pages of a whole batch at once, each
+    page once however many messages need it. Every page is its own
+    ``find().sort().limit()``, an index range scan reading only the page. With a
+    ``breaker`` every read runs under its deadline and fails fast while it is open.
+    """
+
+    def __init__(self, collection, limit=REVIEW_PAGE_SIZE, breaker=None):
+        self.collection = collection
+        self.limit = limit
+        self.breaker = breaker
+        self._pages = {}
+
+    def page(self, product_id=None, sort="oldest", after=None):
+        """(reviews, next token or None) for one page"""
+        key = (product_id, sort, after)
+        if key not in self._pages:
+            with self._guard():
+                docs = list(self._page_cursor(product_id, sort, after))
+            self._pages[key] = split_page(docs, self.limit, sort)
+        return self._pages[key]
+
+    def prefetch(self, keys):
+        """Load first pages for (product_id or None, sort) keys"""
+        for product_id, sort in self._pending(keys):
+            self.page(product_id, sort)
+
+    def _guard(self):
+        return self.breaker.guard() if self.breaker else contextlib.nullcontext()
+
+    def _page_cursor(self, product_id, sort, after):
+        return (
+            self.collection.find(page_filter(product_id, sort, after), REVIEW_PROJECTION)
+            .sort(REVIEW_SORTS[sort])
+            .limit(self.limit + 1)
+        )
+
+    def _pending(self, keys):
+        """Distinct (product_id, sort) keys whose first page is not loaded yet"""
+        return [key for key in dict.fromkeys(keys) if (*key, None) not in self._pages]
+
+
+class AsyncReviewLoader(ReviewLoader):
+    """ReviewLoader over an async (Motor) collection
+
+    Every page a turn needs must be loaded with ``await prefetch()`` first,
+    which reads all of them concurrently; answering then reads only memoized
+    pages and never blocks the loop. Reads are bounded by the Motor client's
+    timeoutMS; the breaker counts their failures but not their wall time,
+    which includes waiting for the loop.
+    """
+
+    async def prefetch(self, keys):
+        await asyncio.gather(*(self._load_first_page(product_id, sort) for product_id, sort in self._pending(keys)))
+
+    async def _load_first_page(self, product_id, sort):
+        with self._guard():
+            docs = await self._page_cursor(product_id, sort, None).to_list(None)
+        self._pages[(product_id, sort, None)] = split_page(docs, self.limit, sort)
+
+    def _guard(self):
+        return self.breaker.guard(timed=False) if self.breaker else contextlib.nullcontext()
+
+    def page(self, product_id=None, sort="oldest", after=None):
+        key = (product_id, sort, after)
+        if key not in self._pages:
+            raise LookupError(f"review page {key} was not prefetched")
+        return self._pages[key]
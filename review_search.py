@@ -0,0 +1,243 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+from live_state import LiveState
+
+REVIEW_SEARCH_TTL = float(os.environ.get("REVIEW_SEARCH_TTL", "300"))
+
+# Fields search results render
+REVIEW_SEARCH_PROJECTION = {"productId": 1, "review": 1, "rating": 1}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and any are as at be but by did do does for from had has have i in is it its me my no not of on or "
+    "our so than that the their them then there these they this to too was we were what which with you your".split()
+)
+
+# Light suffix stripping, first match wins; enough to join smell/smells/smelling, package/packaging
+SUFFIXES = (
+    ("ss", "ss"), ("ies", "y"), ("ingly", ""), ("edly", ""), ("ness", ""), ("ment", ""),
+    ("ing", ""), ("ed", ""), ("es", ""), ("s", ""), ("ly", ""), ("e", ""),
+)
+
+
+def stem(word):
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+class Tokenizer:
+    """Lowercase, map Tanglish/alias phrases to product names, split, drop stopwords, stem"""
+
+    def __init__(self, synonyms):
+        self.synonyms = dict(synonyms)
+        phrases = sorted(self.synonyms, key=len, reverse=True)
+        self._synonym_re = re.compile(r"\b(" + "|".join(map(re.escape, phrases)) + r")\b") if phrases else None
+
+    def __call__(self, text):
+        text = text.lower()
+        if self._synonym_re:
+            text = self._synonym_re.sub(lambda m: self.synonyms[m.group(1)], text)
+        return [stem(t) for t in TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+class Postings:
+    """Document ids and term frequencies of one term, in over-allocated NumPy arrays"""
+
+    __slots__ = ("ids", "tfs", "count")
+
+    def __init__(self):
+        self.ids = np.zeros(4, dtype=np.int64)
+        self.tfs = np.zeros(4, dtype=np.float64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, idx, tf):
+        if self.count == len(self.ids):
+            self.ids = np.concatenate([self.ids, np.zeros_like(self.ids)])
+            self.tfs = np.concatenate([self.tfs, np.zeros_like(self.tfs)])
+        self.ids[self.count] = idx
+        self.tfs[self.count] = tf
+        self.count += 1
+
+
+class ReviewIndex:
+    """Inverted index over review text with BM25 ranking
+
+    Postings are NumPy arrays appended to in place as reviews are added, so
+    adding a review touches only its own terms and nothing is rebuilt from
+    lists on the search path. A term's BM25 weights are kept until the
+    document count or total length moves (any add) and are then recomputed
+    from its postings, so a query only sums precomputed weights over the
+    postings of its terms. ``warm()`` computes all of them up front.
+    """
+
+    def __init__(self, tokenize):
+        self.tokenize = tokenize
+        self.docs = []
+        # Per-document columns, over-allocated so adding a review never copies them
+        self._lengths = np.zeros(1024, dtype=np.float64)
+        self._products = np.zeros(1024, dtype=np.int32)
+        self._ratings = np.zeros(1024, dtype=np.float64)
+        self._product_codes = {}
+        self._postings = {}
+        self._total_length = 0
+        self._weights = {}
+        self._scratch = threading.local()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, review):
+        terms = Counter(self.tokenize(review.get("review") or ""))
+        product = str(review.get("productId"))
+        with self._lock:
+            idx = len(self.docs)
+            if idx == len(self._lengths):
+                self._lengths, self._products, self._ratings = (
+                    np.concatenate([column, np.zeros_like(column)])
+                    for column in (self._lengths, self._products, self._ratings)
+                )
+            self.docs.append({k: review.get(k) for k in ("_id", *REVIEW_SEARCH_PROJECTION)})
+            self._lengths[idx] = sum(terms.values())
+            self._products[idx] = self._product_codes.setdefault(product, len(self._product_codes))
+            self._ratings[idx] = review.get("rating") or 0
+            self._total_length += self._lengths[idx]
+            for term, tf in terms.items():
+                self._postings.setdefault(term, Postings()).append(idx, tf)
+
+    def warm(self):
+        """Compute every term's weights now rather than on the first search that needs them"""
+        with self._lock:
+            for term in self._postings:
+                self._term_weight(term)
+
+    def search(self, query, product_id=None, min_rating=None, max_rating=None, limit=5):
+        """Best matching review documents for query, highest BM25 score first (newest on ties)"""
+        terms = [t for t in dict.fromkeys(self.tokenize(query)) if t in self._postings]
+        if not terms:
+            return []
+        with self._lock:
+            n = len(self.docs)
+            products, ratings = self._products[:n], self._ratings[:n]
+            postings = [self._term_weight(t) for t in terms]
+
+        if len(postings) == 1:
+            candidates, scores = postings[0]
+        else:
+            candidates, scores = self._sum(postings, n)
+
+        keep = np.ones(len(candidates), dtype=bool)
+        if product_id is not None:
+            keep &= products[candidates] == self._product_codes.get(str(product_id), -1)
+        if min_rating is not None:
+            keep &= ratings[candidates] >= min_rating
+        if max_rating is not None:
+            keep &= ratings[candidates] <= max_rating
+        candidates, scores = candidates[keep], scores[keep]
+
+        if len(candidates) > limit:
+            # Everything above the limit-th best score, then the newest of the reviews tied with it
+            cutoff = -np.partition(-scores, limit - 1)[limit - 1]
+            above = np.flatnonzero(scores > cutoff)
+            tied = np.flatnonzero(scores == cutoff)[len(above) - limit:]
+            top = np.concatenate([above, tied])
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((-candidates, -scores))
+        return [self.docs[i] for i in candidates[order]]
+
+    def _sum(self, postings, n):
+        """(document ids, summed weights) of the documents in any of postings
+
+        Sums into a per-thread array zeroed back after each query; a fresh
+        document-sized array per query is mapped and page-faulted in, which set
+        the multi-term tail.
+        """
+        total = getattr(self._scratch, "total", None)
+        if total is None or len(total) < n:
+            total = self._scratch.total = np.zeros(2 * n)
+        total = total[:n]
+        for ids, weights in postings:
+            total[ids] += weights
+        candidates = np.flatnonzero(total > 0)
+        scores = total[candidates]
+        total[candidates] = 0
+        return candidates, scores
+
+    def _term_weight(self, term):
+        """(document ids, BM25 weights) for one term (lock held)"""
+        n = len(self.docs)
+        stats = (n, self._total_length)
+        postings = self._postings[term]
+        ids = postings.ids[:postings.count]
+        cached = self._weights.get(term)
+        if cached is not None and cached[0] == stats:
+            return ids, cached[1]
+        tfs = postings.tfs[:postings.count]
+        avgdl = self._total_length / n or 1.0
+        idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+        weights = idf * tfs * (K1 + 1) / (tfs + K1 * (1 - B + B * self._lengths[ids] / avgdl))
+        self._weights[term] = (stats, weights)
+        return ids, weights
+
+
+class ReviewSearch(LiveState):
+    """Review search index kept current from the reviews collection
+
+    New reviews are indexed as they arrive on the change stream; edits, deletes
+    or a missing change stream rebuild the index (every REVIEW_SEARCH_TTL
+    seconds in the latter case).
+    """
+
+    name = "review-search"
+    # A rebuild streams every review through the tokenizer; its length grows with the collection
+    refresh_deadline = None
+
+    def __init__(self, collection, synonyms, ttl=REVIEW_SEARCH_TTL):
+        self.tokenize = Tokenizer(synonyms)
+        self._index = ReviewIndex(self.tokenize)
+        super().__init__(collection, ttl)
+
+    def set_synonyms(self, synonyms):
+        """Tokenize with new synonyms from now on, reindexing if they changed"""
+        tokenize = Tokenizer(synonyms)
+        if tokenize.synonyms == self.tokenize.synonyms:
+            return
+        self.tokenize = tokenize
+        if self.source != "empty":
+            self.refresh()
+
+    def search(self, query, product_id=None, min_rating=None, max_rating=None, limit=5):
+        return self._index.search(query, product_id, min_rating, max_rating, limit)
+
+    def _refresh(self):
+        index = ReviewIndex(self.tokenize)
+        for review in self.collection.find({}, REVIEW_SEARCH_PROJECTION):
+            index.add(review)
+        # Keep the first searches for each term off the cold path
+        index.warm()
+        self._index = index
+
+    def on_change(self, change):
+        if change["operationType"] == "insert":
+            self._index.add(change["fullDocument"])
+        else:
+            self.refresh()
+
+    def status(self):
+        return {**super().status(), "reviews": len(self._index)}
@@ -0,0 +1,104 @@
+import os
+import threading
+
+from live_state import LiveState
+
+REVIEW_SUMMARY_TTL = float(os.environ.get("REVIEW_SUMMARY_TTL", "300"))
+
+
+class ReviewSummary:
+    """Rating count, sum and histogram for one product"""
+
+    __slots__ = ("count", "total", "histogram")
+
+    def __init__(self, count=0, total=0, histogram=None):
+        self.count = count
+        self.total = total
+        self.histogram = histogram or {}
+
+    def __eq__(self, other):
+        return isinstance(other, ReviewSummary) and (self.count, self.total, self.histogram) == (
+            other.count, other.total, other.histogram)
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0
+
+    def with_rating(self, rating):
+        histogram = dict(self.histogram)
+        histogram[rating] = histogram.get(rating, 0) + 1
+        return ReviewSummary(self.count + 1, self.total + rating, histogram)
+
+
+class ReviewSummaries(LiveState):
+    """Per-product review summaries built with one $group and kept current incrementally
+
+    New reviews are folded in from the collection's change stream; any other change
+    (edits, deletes) or a missing change stream triggers a full re-aggregation,
+    the latter every REVIEW_SUMMARY_TTL seconds.
+    """
+
+    name = "review-summaries"
+
+    def __init__(self, collection, ttl=REVIEW_SUMMARY_TTL, snapshot_path=None):
+        self._summaries = {}
+        self.version = 0
+        self._lock = threading.Lock()
+        super().__init__(collection, ttl, snapshot_path)
+
+    def get(self, product_id):
+        return self._summaries.get(str(product_id))
+
+    def _refresh(self):
+        pipeline = [
+            {"$group": {
+                "_id": {"productId": "$productId", "rating": {"$ifNull": ["$rating", 0]}},
+                "n": {"$sum": 1},
+            }}
+        ]
+        summaries = {}
+        for row in self.collection.aggregate(pipeline):
+            pid = str(row["_id"]["productId"])
+            rating = row["_id"]["rating"]
+            s = summaries.setdefault(pid, ReviewSummary())
+            s.count += row["n"]
+            s.total += rating * row["n"]
+            s.histogram[rating] = s.histogram.get(rating, 0) + row["n"]
+        self._swap(summaries)
+
+    def add(self, review):
+        """Fold a newly inserted review document into its product's summary"""
+        pid = str(review.get("productId"))
+        with self._lock:
+            summaries = dict(self._summaries)
+            summaries[pid] = summaries.get(pid, ReviewSummary()).with_rating(review.get("rating", 0))
+            self._summaries = summaries
+            self.version += 1
+
+    def on_change(self, change):
+        if change["operationType"] == "insert":
+            self.add(change["fullDocument"])
+        else:
+            self.refresh()
+
+    def dump(self):
+        return {"summaries": {
+            pid: {"count": s.count, "total": s.total, "histogram": list(s.histogram.items())}
+            for pid, s in self._summaries.items()
+        }}
+
+    def restore(self, data):
+        self._swap({
+            pid: ReviewSummary(s["count"], s["total"], {rating: n for rating, n in s["histogram"]})
+            for pid, s in data["summaries"].items()
+        })
+
+    def status(self):
+        return {**super().status(), "version": self.version, "products": len(self._summaries)}
+
+    def _swap(self, summaries):
+        with self._lock:
+            # A re-aggregation that finds nothing new keeps the version, and what is cached on it
+            if summaries != self._summaries:
+                self._summaries = summaries
+                self.version += 1
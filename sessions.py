@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+try:
+    import redis
+except ImportError:  # only needed for the shared store
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL = float(os.environ.get("SESSION_TTL", "1800"))
+SESSION_MAX_ENTRIES = int(os.environ.get("SESSION_MAX_ENTRIES", "10000"))
+
+# What a follow-up question can refer back to; product is a tuple of names for comparisons
+SessionContext = namedtuple("SessionContext", "intent product")
+
+
+def encode_context(context):
+    products = context.product if isinstance(context.product, tuple) else (context.product,)
+    return "\t".join((context.intent, *products))
+
+
+def decode_context(value):
+    intent, *products = value.split("\t")
+    return SessionContext(intent, tuple(products) if intent == "compare" else products[0])
+
+
+class LocalSessionStore:
+    """In-process session contexts with LRU and TTL eviction, at most max_entries of them
+
+    Each gunicorn worker has its own; use RedisSessionStore to share sessions.
+    """
+
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES, ttl=SESSION_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            expires, context = entry
+            if expires < time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return context
+
+    def set(self, session_id, context):
+        with self._lock:
+            self._entries[session_id] = (time.monotonic() + self.ttl, context)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisSessionStore:
+    """Session contexts in Redis, shared by every worker
+
+    Entries expire after ttl; the entry bound is the server's maxmemory with an
+    LRU eviction policy (e.g. ``allkeys-lru``). A Redis outage only loses
+    context: lookups return None and writes are dropped.
+    """
+
+    def __init__(self, client, ttl=SESSION_TTL, prefix="chat-session:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, session_id):
+        try:
+            value = self.client.getex(self.prefix + session_id, ex=int(self.ttl))
+        except redis.RedisError as e:
+            logger.warning("Session lookup failed: %s", e)
+            return None
+        return decode_context(value.decode()) if value else None
+
+    def set(self, session_id, context):
+        try:
+            self.client.set(self.prefix + session_id, encode_context(context), ex=int(self.ttl))
+        except redis.RedisError as e:
+            logger.warning("Session write failed: %s", e)
+
+
+def make_session_store(url=None, max_entries=SESSION_MAX_ENTRIES, ttl=SESSION_TTL):
+    """RedisSessionStore for a redis:// URL, else a LocalSessionStore"""
+    if not url:
+        return LocalSessionStore(max_entries, ttl)
+    if redis is None:
+        raise RuntimeError("SESSION_REDIS_URL is set but the redis package is not installed")
+    return RedisSessionStore(redis.Redis.from_url(url), ttl)